@@ -0,0 +1,121 @@
+"""Added practice_daily_rollup table maintained by practice_session triggers
+
+Revision ID: 1aa9113be968
+Revises: d8ca795128f4
+Create Date: 2026-10-18 14:56:09.735424
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1aa9113be968'
+down_revision: Union[str, Sequence[str], None] = 'd8ca795128f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ROLLUP_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION practice_daily_rollup_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE practice_daily_rollup AS r
+        SET total_minutes = r.total_minutes - d.total_minutes,
+            session_count = r.session_count - d.session_count
+        FROM (
+            SELECT g.user_id, o.goal_id, o.date,
+                   COALESCE(SUM(o.duration), 0) AS total_minutes, COUNT(*) AS session_count
+            FROM old_rows AS o
+            JOIN goal AS g ON g.id = o.goal_id
+            WHERE o.date IS NOT NULL
+            GROUP BY g.user_id, o.goal_id, o.date
+        ) AS d
+        WHERE r.user_id = d.user_id AND r.goal_id = d.goal_id AND r.date = d.date;
+
+        DELETE FROM practice_daily_rollup AS r
+        USING (
+            SELECT DISTINCT g.user_id, o.goal_id, o.date
+            FROM old_rows AS o
+            JOIN goal AS g ON g.id = o.goal_id
+        ) AS d
+        WHERE r.user_id = d.user_id AND r.goal_id = d.goal_id AND r.date = d.date
+          AND r.session_count <= 0;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO practice_daily_rollup AS r (user_id, goal_id, date, total_minutes, session_count)
+        SELECT g.user_id, n.goal_id, n.date, COALESCE(SUM(n.duration), 0), COUNT(*)
+        FROM new_rows AS n
+        JOIN goal AS g ON g.id = n.goal_id
+        WHERE n.date IS NOT NULL
+        GROUP BY g.user_id, n.goal_id, n.date
+        ON CONFLICT (user_id, goal_id, date) DO UPDATE
+        SET total_minutes = r.total_minutes + EXCLUDED.total_minutes,
+            session_count = r.session_count + EXCLUDED.session_count;
+    END IF;
+
+    RETURN NULL;
+END;
+$$
+"""
+
+ROLLUP_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER practice_daily_rollup_insert AFTER INSERT ON practice_session
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION practice_daily_rollup_apply()
+    """,
+    """
+    CREATE TRIGGER practice_daily_rollup_update AFTER UPDATE ON practice_session
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION practice_daily_rollup_apply()
+    """,
+    """
+    CREATE TRIGGER practice_daily_rollup_delete AFTER DELETE ON practice_session
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION practice_daily_rollup_apply()
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('practice_daily_rollup',
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('goal_id', sa.UUID(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('total_minutes', sa.Integer(), nullable=False),
+    sa.Column('session_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['goal_id'], ['goal.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'goal_id', 'date')
+    )
+    op.create_index('ix_practice_daily_rollup_user_id_date', 'practice_daily_rollup', ['user_id', 'date'], unique=False)
+
+    op.execute(ROLLUP_FUNCTION_SQL)
+    for statement in ROLLUP_TRIGGERS_SQL:
+        op.execute(statement)
+
+    # The triggers hold a lock on practice_session from here on, so no writes slip
+    # in between creating them and the backfill.
+    op.execute("""
+        INSERT INTO practice_daily_rollup (user_id, goal_id, date, total_minutes, session_count)
+        SELECT g.user_id, ps.goal_id, ps.date, COALESCE(SUM(ps.duration), 0), COUNT(*)
+        FROM practice_session AS ps
+        JOIN goal AS g ON g.id = ps.goal_id
+        WHERE ps.date IS NOT NULL
+        GROUP BY g.user_id, ps.goal_id, ps.date
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS practice_daily_rollup_delete ON practice_session")
+    op.execute("DROP TRIGGER IF EXISTS practice_daily_rollup_update ON practice_session")
+    op.execute("DROP TRIGGER IF EXISTS practice_daily_rollup_insert ON practice_session")
+    op.execute("DROP FUNCTION IF EXISTS practice_daily_rollup_apply()")
+    op.drop_index('ix_practice_daily_rollup_user_id_date', table_name='practice_daily_rollup')
+    op.drop_table('practice_daily_rollup')
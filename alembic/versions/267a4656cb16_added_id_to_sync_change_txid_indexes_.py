@@ -0,0 +1,42 @@
+"""Added id to sync change_txid indexes for keyset paging
+
+Revision ID: 267a4656cb16
+Revises: 994586efcaf6
+Create Date: 2026-10-18 15:59:23.037015
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '267a4656cb16'
+down_revision: Union[str, Sequence[str], None] = '994586efcaf6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('goal', 'ix_goal_user_id_change_txid', ['user_id', 'change_txid']),
+    ('practice_session', 'ix_practice_session_goal_id_change_txid', ['goal_id', 'change_txid']),
+    ('sync_tombstone', 'ix_sync_tombstone_user_id_change_txid', ['user_id', 'change_txid']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        for table, name, columns in INDEXES:
+            op.create_index(f'{name}_id', table, [*columns, 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, name, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(f'{name}_id', table_name=table, postgresql_concurrently=True, if_exists=True)
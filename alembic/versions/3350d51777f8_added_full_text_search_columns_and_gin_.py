@@ -0,0 +1,47 @@
+"""Added full-text search columns and GIN indexes for session notes and goals
+
+Revision ID: 3350d51777f8
+Revises: 1aa9113be968
+Create Date: 2026-10-18 15:13:17.607712
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3350d51777f8'
+down_revision: Union[str, Sequence[str], None] = '1aa9113be968'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SESSION_SEARCH_SQL = "to_tsvector('english', coalesce(notes, ''))"
+GOAL_SEARCH_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A')"
+    " || setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Adding a STORED generated column rewrites the table, which fills it in for every existing row.
+    op.add_column('practice_session', sa.Column('search', postgresql.TSVECTOR(), sa.Computed(SESSION_SEARCH_SQL, persisted=True), nullable=True))
+    op.add_column('goal', sa.Column('search', postgresql.TSVECTOR(), sa.Computed(GOAL_SEARCH_SQL, persisted=True), nullable=True))
+
+    # CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_practice_session_search', 'practice_session', ['search'], unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_goal_search', 'goal', ['search'], unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_goal_search', table_name='goal', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_practice_session_search', table_name='practice_session', postgresql_concurrently=True, if_exists=True)
+
+    op.drop_column('goal', 'search')
+    op.drop_column('practice_session', 'search')
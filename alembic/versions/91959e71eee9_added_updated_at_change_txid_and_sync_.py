@@ -0,0 +1,133 @@
+"""Added updated_at, change_txid and sync_tombstone for delta sync
+
+Revision ID: 91959e71eee9
+Revises: 9522c9739392
+Create Date: 2026-10-18 15:40:23.619200
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '91959e71eee9'
+down_revision: Union[str, Sequence[str], None] = '9522c9739392'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+CHANGE_TXID_SQL = "(pg_current_xact_id()::text::bigint)"
+
+SYNC_FUNCTIONS_SQL = [
+    f"""
+    CREATE OR REPLACE FUNCTION sync_touch() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.updated_at := now();
+        NEW.change_txid := {CHANGE_TXID_SQL};
+        RETURN NEW;
+    END;
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sync_tombstone_goal() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO sync_tombstone (user_id, entity, entity_id)
+        SELECT o.user_id, 'goal', o.id
+        FROM old_rows AS o
+        JOIN "user" AS u ON u.id = o.user_id;
+        RETURN NULL;
+    END;
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION sync_tombstone_practice_session() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO sync_tombstone (user_id, entity, entity_id)
+        SELECT g.user_id, 'practice_session', o.id
+        FROM old_rows AS o
+        JOIN goal AS g ON g.id = o.goal_id;
+        RETURN NULL;
+    END;
+    $$
+    """,
+]
+
+SYNC_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER goal_sync_touch BEFORE UPDATE ON goal
+    FOR EACH ROW EXECUTE FUNCTION sync_touch()
+    """,
+    """
+    CREATE TRIGGER goal_sync_tombstone AFTER DELETE ON goal
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sync_tombstone_goal()
+    """,
+    """
+    CREATE TRIGGER practice_session_sync_touch BEFORE UPDATE ON practice_session
+    FOR EACH ROW EXECUTE FUNCTION sync_touch()
+    """,
+    """
+    CREATE TRIGGER practice_session_sync_tombstone AFTER DELETE ON practice_session
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION sync_tombstone_practice_session()
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ['goal', 'practice_session']:
+        # now() is stable, so existing rows take it without a table rewrite.
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+        # A volatile default would rewrite the table, so existing rows get 0 and only new
+        # rows get the transaction id. 0 is below every sync token.
+        op.add_column(table, sa.Column('change_txid', sa.BigInteger(), server_default=sa.text('0'), nullable=False))
+        op.alter_column(table, 'change_txid', server_default=sa.text(CHANGE_TXID_SQL))
+
+    op.create_table('sync_tombstone',
+    sa.Column('id', sa.BigInteger(), sa.Identity(always=False), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.UUID(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('change_txid', sa.BigInteger(), server_default=sa.text(CHANGE_TXID_SQL), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_tombstone_user_id_change_txid', 'sync_tombstone', ['user_id', 'change_txid'], unique=False)
+    op.create_index('ix_sync_tombstone_deleted_at', 'sync_tombstone', ['deleted_at'], unique=False)
+
+    for statement in [*SYNC_FUNCTIONS_SQL, *SYNC_TRIGGERS_SQL]:
+        op.execute(statement)
+
+    # CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_goal_user_id_change_txid', 'goal', ['user_id', 'change_txid'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_practice_session_goal_id_change_txid', 'practice_session', ['goal_id', 'change_txid'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_practice_session_goal_id_change_txid', table_name='practice_session', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_goal_user_id_change_txid', table_name='goal', postgresql_concurrently=True, if_exists=True)
+
+    op.execute("DROP TRIGGER IF EXISTS practice_session_sync_tombstone ON practice_session")
+    op.execute("DROP TRIGGER IF EXISTS practice_session_sync_touch ON practice_session")
+    op.execute("DROP TRIGGER IF EXISTS goal_sync_tombstone ON goal")
+    op.execute("DROP TRIGGER IF EXISTS goal_sync_touch ON goal")
+    op.execute("DROP FUNCTION IF EXISTS sync_tombstone_practice_session()")
+    op.execute("DROP FUNCTION IF EXISTS sync_tombstone_goal()")
+    op.execute("DROP FUNCTION IF EXISTS sync_touch()")
+
+    op.drop_index('ix_sync_tombstone_deleted_at', table_name='sync_tombstone')
+    op.drop_index('ix_sync_tombstone_user_id_change_txid', table_name='sync_tombstone')
+    op.drop_table('sync_tombstone')
+    for table in ['practice_session', 'goal']:
+        op.drop_column(table, 'change_txid')
+        op.drop_column(table, 'updated_at')
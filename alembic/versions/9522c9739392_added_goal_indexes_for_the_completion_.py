@@ -0,0 +1,34 @@
+"""Added goal indexes for the completion and title prefix filters
+
+Revision ID: 9522c9739392
+Revises: 3350d51777f8
+Create Date: 2026-10-18 15:34:55.597161
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9522c9739392'
+down_revision: Union[str, Sequence[str], None] = '3350d51777f8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_goal_user_id_complete_id', 'goal', ['user_id', 'complete', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        # text_pattern_ops lets LIKE 'prefix%' use the index whatever the database collation.
+        op.create_index('ix_goal_user_id_title', 'goal', ['user_id', 'title'], unique=False, postgresql_ops={'title': 'text_pattern_ops'}, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_goal_user_id_title', table_name='goal', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_goal_user_id_complete_id', table_name='goal', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,31 @@
+"""Added practice_daily_rollup goal_id index for goal delete cascades
+
+Revision ID: 994586efcaf6
+Revises: 91959e71eee9
+Create Date: 2026-10-18 15:49:23.792046
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '994586efcaf6'
+down_revision: Union[str, Sequence[str], None] = '91959e71eee9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_practice_daily_rollup_goal_id', 'practice_daily_rollup', ['goal_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_practice_daily_rollup_goal_id', table_name='practice_daily_rollup', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,39 @@
+"""Moved practice_session duration into a generated column
+
+Revision ID: d8ca795128f4
+Revises: ff38a713d7a2
+Create Date: 2026-10-18 14:54:48.165331
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8ca795128f4'
+down_revision: Union[str, Sequence[str], None] = 'ff38a713d7a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DURATION_SQL = (
+    "((EXTRACT(HOUR FROM end_time) * 60 + EXTRACT(MINUTE FROM end_time)"
+    " - EXTRACT(HOUR FROM start_time) * 60 - EXTRACT(MINUTE FROM start_time)"
+    " + 1440)::integer % 1440)"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A plain column can't be altered into a generated one, so swap it out.
+    # Adding the STORED column rewrites the table, which backfills every existing row.
+    op.drop_column('practice_session', 'duration')
+    op.add_column('practice_session', sa.Column('duration', sa.Integer(), sa.Computed(DURATION_SQL, persisted=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('practice_session', 'duration')
+    op.add_column('practice_session', sa.Column('duration', sa.Integer(), nullable=True))
+    op.execute(f"UPDATE practice_session SET duration = {DURATION_SQL}")
@@ -0,0 +1,33 @@
+"""Added composite indexes for the per-user goal and practice_session lookups
+
+Revision ID: ff38a713d7a2
+Revises: 9fc2bc1bfeaf
+Create Date: 2026-10-18 14:53:29.698391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ff38a713d7a2'
+down_revision: Union[str, Sequence[str], None] = '9fc2bc1bfeaf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_goal_user_id_id', 'goal', ['user_id', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_practice_session_goal_id_date_id', 'practice_session', ['goal_id', 'date', 'id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_practice_session_goal_id_date_id', table_name='practice_session', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_goal_user_id_id', table_name='goal', postgresql_concurrently=True, if_exists=True)
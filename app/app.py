@@ -1,19 +1,37 @@
-from fastapi import FastAPI
+from time import perf_counter
+import_started = perf_counter()
+
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from app.schemas import UserRead, UserCreate, UserUpdate
-from app.db import create_db_and_tables
+from app.db import engine, replica_engines
+from app.replicas import replicas
+from app.cache import ReadYourWritesMiddleware
+from app.startup import startup
+from app.metrics import MetricsMiddleware, instrument_engine as instrument_metrics
+from app.diagnostics import DiagnosticsMiddleware, instrument_engine as instrument_diagnostics
+from app.loadshed import LoadSheddingMiddleware
+from app.ratelimit import rate_limit
+from app.settings import METRICS_ENABLED, DIAGNOSTICS_ENABLED
 # from sqlalchemy import select
 from contextlib import asynccontextmanager
+import asyncio
 from app.users import auth_backend, fastapi_users
 # from datetime import date, time, timedelta
-from .routers import goals, sessions
+from .routers import goals, sessions, stats, search, sync, health, metrics
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await create_db_and_tables()
+    await startup(imported_in)
+    monitor = asyncio.create_task(replicas.monitor()) if replica_engines else None
     yield
+    # Runs once uvicorn has drained in-flight requests on SIGTERM.
+    if monitor:
+        monitor.cancel()
+    for e in [engine, *replica_engines]:
+        await e.dispose()
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, dependencies=[Depends(rate_limit)])
 
 origins = [
     "http://localhost:3000",
@@ -21,18 +39,41 @@ origins = [
     "http://localhost:8000"
 ]
 
+# Always on: read caches, as well as replicas, need to know the client just wrote.
+app.add_middleware(ReadYourWritesMiddleware)
+# Inside CORS, so browsers can read the 503, and inside metrics, so it's counted.
+app.add_middleware(LoadSheddingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Last-Write"],
 )
 
+if DIAGNOSTICS_ENABLED:
+    app.add_middleware(DiagnosticsMiddleware)
+    for e in [engine, *replica_engines]:
+        instrument_diagnostics(e)
+
+if METRICS_ENABLED:
+    # Added last so it wraps everything else, CORS preflights included.
+    app.add_middleware(MetricsMiddleware)
+    for e in [engine, *replica_engines]:
+        instrument_metrics(e)
+
 app.include_router(fastapi_users.get_auth_router(auth_backend), prefix='/auth/jwt', tags=["auth"])
 app.include_router(fastapi_users.get_register_router(UserRead, UserCreate), prefix="/auth", tags=["auth"])
 app.include_router(fastapi_users.get_reset_password_router(), prefix="/auth", tags=["auth"])
 app.include_router(fastapi_users.get_verify_router(UserRead), prefix="/auth", tags=["auth"])
 app.include_router(fastapi_users.get_users_router(UserRead, UserUpdate), prefix="/users", tags=["users"])
 app.include_router(goals.router)
-app.include_router(sessions.router)
\ No newline at end of file
+app.include_router(sessions.router)
+app.include_router(stats.router)
+app.include_router(search.router)
+app.include_router(sync.router)
+app.include_router(health.router)
+if METRICS_ENABLED:
+    app.include_router(metrics.router)
+imported_in = perf_counter() - import_started
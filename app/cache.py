@@ -0,0 +1,188 @@
+from fastapi import Request, Response
+from app.settings import READ_CACHE_MAX_ENTRIES, READ_CACHE_TTL, REPLICA_STICKY_SECONDS, SECRET_KEY
+from app.serialization import RawJSONResponse
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass
+from hashlib import blake2b
+from itertools import count
+from time import monotonic, time
+from typing import Any
+import hashlib
+import hmac
+import math
+import uuid
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire `ttl` seconds after they are set."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[1] < monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl <= 0:
+            return
+        self._data[key] = (value, monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+@dataclass(frozen=True)
+class CachedBody:
+    body: bytes
+    etag: str
+
+class UserReadCache:
+    """
+    Serialized GET responses keyed by (user, version, path, query).
+
+    Write handlers call `bump(user_id)`. That moves the user onto a new version, so their
+    old entries stop matching and age out of the LRU. It also records when they last wrote,
+    which keeps their reads on the primary for a moment (see app/replicas.py).
+
+    Versions are only kept as long as an entry could outlive the write. A user without one
+    is on `floor`, which moves on whenever a version is pushed out early to stay within
+    `maxsize`, so none of the old entries can match again.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize, ttl)
+        self._versions = TTLCache(maxsize, max(ttl, REPLICA_STICKY_SECONDS))
+        self._counter = count(1)
+        self.floor = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.entries.ttl > 0
+
+    def version(self, user_id: uuid.UUID) -> int:
+        return self._versions.get(user_id, (self.floor, 0.0))[0]
+
+    def written_at(self, user_id: uuid.UUID) -> float | None:
+        entry = self._versions.get(user_id)
+        return entry[1] if entry else None
+
+    def bump(self, user_id: uuid.UUID) -> None:
+        evictions = self._versions.evictions
+        self._versions.set(user_id, (next(self._counter), monotonic()))
+        if self._versions.evictions != evictions:
+            self.floor = next(self._counter)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.entries.hits,
+            "misses": self.entries.misses,
+            "entries": len(self.entries),
+        }
+
+read_cache = UserReadCache(READ_CACHE_MAX_ENTRIES, READ_CACHE_TTL)
+
+# A bump only reaches the worker that served the write, and read_cache.written_at only knows
+# about writes this worker served. The client carries the time of its last write between
+# workers, as a cookie or, without a cookie jar, by echoing the header back.
+STICKY_COOKIE = "last_write"
+STICKY_HEADER = "x-last-write"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+def sign_write_time(at: float) -> str:
+    stamp = str(int(at * 1000))
+    signature = hmac.new(SECRET_KEY.encode(), stamp.encode(), hashlib.sha256).hexdigest()[:32]
+    return f"{stamp}.{signature}"
+
+def signed_write_time(value: str | None) -> float | None:
+    stamp, _, signature = (value or "").partition(".")
+    if not stamp.isdigit() or not hmac.compare_digest(sign_write_time(int(stamp) / 1000), value):
+        return None
+    return int(stamp) / 1000
+
+class ReadYourWritesMiddleware:
+    """Marks every successful write's response with the signed time it was served."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marked(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                value = sign_write_time(time())
+                # Long enough for both a lagging replica and another worker's cache entry.
+                max_age = math.ceil(max(REPLICA_STICKY_SECONDS, read_cache.entries.ttl))
+                cookie = f"{STICKY_COOKIE}={value}; Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"set-cookie", cookie.encode()),
+                    (STICKY_HEADER.encode(), value.encode()),
+                ]
+            await send(message)
+
+        await self.app(scope, receive, send_marked)
+
+def client_wrote_recently(request: Request, within: float) -> bool:
+    written_at = signed_write_time(request.cookies.get(STICKY_COOKIE) or request.headers.get(STICKY_HEADER))
+    return written_at is not None and time() - written_at < within
+
+def make_etag(body: bytes) -> str:
+    return f'"{blake2b(body, digest_size=16).hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+async def cached_response(
+    request: Request,
+    user_id: uuid.UUID,
+    build: Callable[[], Awaitable[bytes]]
+) -> Response:
+    # Take the version before building, so a write that lands mid-build leaves this
+    # entry under the old version, where it can never be read.
+    key = (user_id, read_cache.version(user_id), request.url.path, request.url.query)
+    # The write may have been served by another worker, whose bump this one never saw. Its
+    # entry and the client's ETag can both be from before it, so build a fresh body.
+    wrote_recently = client_wrote_recently(request, read_cache.entries.ttl)
+
+    cached = read_cache.entries.get(key) if read_cache.enabled and not wrote_recently else None
+    if cached is None:
+        body = await build()
+        cached = CachedBody(body=body, etag=make_etag(body))
+        if read_cache.enabled:
+            read_cache.entries.set(key, cached)
+
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if not wrote_recently and etag_matches(request, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return RawJSONResponse(content=cached.body, headers=headers)
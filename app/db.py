@@ -1,63 +1,303 @@
-from sqlalchemy import Column, String, ForeignKey, Integer, Boolean, Time, Text, Date, event
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import (
+    Column, String, ForeignKey, Integer, BigInteger, Boolean, Time, Text, Date, DateTime, Index, Identity, Computed,
+    DDL, event, func, text
+)
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
 import uuid
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker, AsyncAttrs
-from sqlalchemy.orm import DeclarativeBase, relationship, Mapped
-from app.settings import DATABASE_URL
+from sqlalchemy.orm import DeclarativeBase, relationship, Mapped, make_transient_to_detached, deferred
+from sqlalchemy import inspect
+from app.settings import (
+    DATABASE_URL, USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL,
+    DB_POOL_PROFILE, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING, DB_STATEMENT_CACHE_SIZE, DATABASE_REPLICA_URLS
+)
+from app.cache import TTLCache
+from app.loadshed import TimedQueuePool
 from fastapi import Depends
 from collections.abc import AsyncGenerator
 from fastapi_users.db import SQLAlchemyUserDatabase, SQLAlchemyBaseUserTableUUID
-from datetime import date, timedelta
+from datetime import date
 
 
 class Base(DeclarativeBase, AsyncAttrs):
     pass
 
+# Search documents for /search. Generated, so Postgres keeps them current on every write,
+# and deferred, so plain ORM loads don't drag them along.
+SESSION_SEARCH_SQL = "to_tsvector('english', coalesce(notes, ''))"
+GOAL_SEARCH_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A')"
+    " || setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+# Minutes between start and end, wrapping past midnight. Postgres keeps it up to date
+# for every INSERT/UPDATE, including bulk and Core statements.
+SESSION_DURATION_SQL = (
+    "((EXTRACT(HOUR FROM end_time) * 60 + EXTRACT(MINUTE FROM end_time)"
+    " - EXTRACT(HOUR FROM start_time) * 60 - EXTRACT(MINUTE FROM start_time)"
+    " + 1440)::integer % 1440)"
+)
+
+# The writing transaction's id, for /sync. Rows get it on INSERT from the column default
+# and on UPDATE from the sync_touch trigger, so every write path keeps it current.
+CHANGE_TXID_SQL = "(pg_current_xact_id()::text::bigint)"
+
 class User(SQLAlchemyBaseUserTableUUID, Base):
-    goals: Mapped["Goal"] = relationship(back_populates="user_goal")
+    goals: Mapped[list["Goal"]] = relationship(back_populates="user_goal", passive_deletes=True)
 
 class PracticeSession(Base):
     __tablename__ = 'practice_session'
+    __table_args__ = (
+        Index('ix_practice_session_goal_id_date_id', 'goal_id', 'date', 'id'),
+        Index('ix_practice_session_search', 'search', postgresql_using='gin'),
+        Index('ix_practice_session_goal_id_change_txid_id', 'goal_id', 'change_txid', 'id'),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, nullable=False, default=uuid.uuid4)
     date = Column(Date, default=date.today)
     start_time = Column(Time)
     end_time = Column(Time)
-    duration = Column(Integer)
+    duration = Column(Integer, Computed(SESSION_DURATION_SQL, persisted=True))
     notes = Column(Text, default="Enter notes here!")
     goal_id = Column(UUID(as_uuid=True), ForeignKey("goal.id", ondelete="CASCADE"), nullable=True)
+    search = deferred(Column(TSVECTOR, Computed(SESSION_SEARCH_SQL, persisted=True)))
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    change_txid = Column(BigInteger, nullable=False, server_default=text(CHANGE_TXID_SQL))
 
     goal: Mapped["Goal"] = relationship(back_populates="practice_session_entry")
 
-    def calculate_session_duration(self):
-        start_delta = timedelta(
-            hours=self.start_time.hour,
-            minutes=self.start_time.minute
-            )
-        
-        end_delta = timedelta(
-            hours=self.end_time.hour,
-            minutes=self.end_time.minute
-        )
-
-        diff = end_delta - start_delta 
-        total_duration = diff.seconds / 60
-
-        self.duration = total_duration
-        
+    # Fetch the generated duration back with RETURNING on UPDATE as well as INSERT.
+    __mapper_args__ = {"eager_defaults": True}
+
 class Goal(Base):
     __tablename__ = 'goal'
+    __table_args__ = (
+        Index('ix_goal_user_id_id', 'user_id', 'id'),
+        Index('ix_goal_user_id_complete_id', 'user_id', 'complete', 'id'),
+        Index('ix_goal_user_id_title', 'user_id', 'title', postgresql_ops={'title': 'text_pattern_ops'}),
+        Index('ix_goal_search', 'search', postgresql_using='gin'),
+        Index('ix_goal_user_id_change_txid_id', 'user_id', 'change_txid', 'id'),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, nullable=False, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
     title = Column(String(100))
     description = Column(Text, nullable=False, default="Enter description here!")
     complete = Column(Boolean, default=False)
+    search = deferred(Column(TSVECTOR, Computed(GOAL_SEARCH_SQL, persisted=True)))
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    change_txid = Column(BigInteger, nullable=False, server_default=text(CHANGE_TXID_SQL))
 
     user_goal: Mapped["User"] = relationship(back_populates="goals")
-    practice_session_entry: Mapped["PracticeSession"] = relationship(back_populates="goal")
+    # ON DELETE CASCADE removes the children, so the ORM needn't load them to delete a goal.
+    practice_session_entry: Mapped[list["PracticeSession"]] = relationship(
+        back_populates="goal", passive_deletes=True
+    )
+
+# Plain column lists for the response paths, which read rows rather than ORM objects.
+GOAL_COLUMNS = (Goal.id, Goal.user_id, Goal.title, Goal.description, Goal.complete)
+SESSION_COLUMNS = (
+    PracticeSession.id,
+    PracticeSession.date,
+    PracticeSession.start_time,
+    PracticeSession.end_time,
+    PracticeSession.duration,
+    PracticeSession.notes,
+    PracticeSession.goal_id,
+)
+
+class PracticeDailyRollup(Base):
+    __tablename__ = 'practice_daily_rollup'
+    __table_args__ = (
+        Index('ix_practice_daily_rollup_user_id_date', 'user_id', 'date'),
+        # For the ON DELETE CASCADE from goal, which only knows the goal_id.
+        Index('ix_practice_daily_rollup_goal_id', 'goal_id'),
+    )
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"), primary_key=True)
+    goal_id = Column(UUID(as_uuid=True), ForeignKey("goal.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+    total_minutes = Column(Integer, nullable=False, default=0)
+    session_count = Column(Integer, nullable=False, default=0)
+
+# Statement-level triggers keep practice_daily_rollup in step with practice_session in the
+# same transaction, for single rows, bulk statements and ON DELETE CASCADE from goal/user.
+ROLLUP_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION practice_daily_rollup_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE practice_daily_rollup AS r
+        SET total_minutes = r.total_minutes - d.total_minutes,
+            session_count = r.session_count - d.session_count
+        FROM (
+            SELECT g.user_id, o.goal_id, o.date,
+                   COALESCE(SUM(o.duration), 0) AS total_minutes, COUNT(*) AS session_count
+            FROM old_rows AS o
+            JOIN goal AS g ON g.id = o.goal_id
+            WHERE o.date IS NOT NULL
+            GROUP BY g.user_id, o.goal_id, o.date
+        ) AS d
+        WHERE r.user_id = d.user_id AND r.goal_id = d.goal_id AND r.date = d.date;
+
+        DELETE FROM practice_daily_rollup AS r
+        USING (
+            SELECT DISTINCT g.user_id, o.goal_id, o.date
+            FROM old_rows AS o
+            JOIN goal AS g ON g.id = o.goal_id
+        ) AS d
+        WHERE r.user_id = d.user_id AND r.goal_id = d.goal_id AND r.date = d.date
+          AND r.session_count <= 0;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO practice_daily_rollup AS r (user_id, goal_id, date, total_minutes, session_count)
+        SELECT g.user_id, n.goal_id, n.date, COALESCE(SUM(n.duration), 0), COUNT(*)
+        FROM new_rows AS n
+        JOIN goal AS g ON g.id = n.goal_id
+        WHERE n.date IS NOT NULL
+        GROUP BY g.user_id, n.goal_id, n.date
+        ON CONFLICT (user_id, goal_id, date) DO UPDATE
+        SET total_minutes = r.total_minutes + EXCLUDED.total_minutes,
+            session_count = r.session_count + EXCLUDED.session_count;
+    END IF;
+
+    RETURN NULL;
+END;
+$$
+"""
+
+ROLLUP_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER practice_daily_rollup_insert AFTER INSERT ON practice_session
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION practice_daily_rollup_apply()
+    """,
+    """
+    CREATE TRIGGER practice_daily_rollup_update AFTER UPDATE ON practice_session
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION practice_daily_rollup_apply()
+    """,
+    """
+    CREATE TRIGGER practice_daily_rollup_delete AFTER DELETE ON practice_session
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION practice_daily_rollup_apply()
+    """,
+]
+
+for statement in [ROLLUP_FUNCTION_SQL, *ROLLUP_TRIGGERS_SQL]:
+    event.listen(PracticeSession.__table__, "after_create", DDL(statement))
+
+class SyncTombstone(Base):
+    """A deleted goal or session, kept for SYNC_TOMBSTONE_RETENTION_DAYS so /sync can report it."""
+    __tablename__ = 'sync_tombstone'
+    __table_args__ = (
+        Index('ix_sync_tombstone_user_id_change_txid_id', 'user_id', 'change_txid', 'id'),
+        Index('ix_sync_tombstone_deleted_at', 'deleted_at'),
+    )
 
-engine = create_async_engine(DATABASE_URL)
+    id = Column(BigInteger, Identity(), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    entity = Column(String(20), nullable=False)
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    change_txid = Column(BigInteger, nullable=False, server_default=text(CHANGE_TXID_SQL))
+
+SYNC_FUNCTIONS_SQL = [
+    f"""
+    CREATE OR REPLACE FUNCTION sync_touch() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.updated_at := now();
+        NEW.change_txid := {CHANGE_TXID_SQL};
+        RETURN NEW;
+    END;
+    $$
+    """,
+    # Joined to the owning user, so a goal deleted along with its user leaves nothing behind.
+    """
+    CREATE OR REPLACE FUNCTION sync_tombstone_goal() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO sync_tombstone (user_id, entity, entity_id)
+        SELECT o.user_id, 'goal', o.id
+        FROM old_rows AS o
+        JOIN "user" AS u ON u.id = o.user_id;
+        RETURN NULL;
+    END;
+    $$
+    """,
+    # Sessions removed by ON DELETE CASCADE find no goal to join, since it is already gone.
+    # The goal's own tombstone covers them.
+    """
+    CREATE OR REPLACE FUNCTION sync_tombstone_practice_session() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO sync_tombstone (user_id, entity, entity_id)
+        SELECT g.user_id, 'practice_session', o.id
+        FROM old_rows AS o
+        JOIN goal AS g ON g.id = o.goal_id;
+        RETURN NULL;
+    END;
+    $$
+    """,
+]
+
+SYNC_TRIGGERS_SQL = {
+    "goal": [
+        """
+        CREATE TRIGGER goal_sync_touch BEFORE UPDATE ON goal
+        FOR EACH ROW EXECUTE FUNCTION sync_touch()
+        """,
+        """
+        CREATE TRIGGER goal_sync_tombstone AFTER DELETE ON goal
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION sync_tombstone_goal()
+        """,
+    ],
+    "practice_session": [
+        """
+        CREATE TRIGGER practice_session_sync_touch BEFORE UPDATE ON practice_session
+        FOR EACH ROW EXECUTE FUNCTION sync_touch()
+        """,
+        """
+        CREATE TRIGGER practice_session_sync_tombstone AFTER DELETE ON practice_session
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION sync_tombstone_practice_session()
+        """,
+    ],
+}
+
+# goal is created before practice_session, so the functions go in with it.
+for statement in [*SYNC_FUNCTIONS_SQL, *SYNC_TRIGGERS_SQL["goal"]]:
+    event.listen(Goal.__table__, "after_create", DDL(statement))
+for statement in SYNC_TRIGGERS_SQL["practice_session"]:
+    event.listen(PracticeSession.__table__, "after_create", DDL(statement))
+
+def engine_options() -> dict:
+    connect_args = {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    if DB_POOL_PROFILE == "pgbouncer":
+        # Transaction pooling hands each transaction to any server connection, so named
+        # prepared statements can't be reused and must not collide.
+        connect_args = {
+            "prepared_statement_cache_size": 0,
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+engine = create_async_engine(DATABASE_URL, **engine_options())
+replica_engines = [create_async_engine(url, **engine_options()) for url in DATABASE_REPLICA_URLS]
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
 async def create_db_and_tables():
@@ -68,10 +308,33 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
 
-async def get_user_db(session: AsyncSession = Depends(get_async_session)):
-    yield SQLAlchemyUserDatabase(session, User)
+# Detached User snapshots by id, so authenticating a request doesn't need a query.
+user_cache = TTLCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL)
+
+def detached_copy(user: User) -> User:
+    copy = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+class CachedUserDatabase(SQLAlchemyUserDatabase):
+    async def get(self, id: uuid.UUID) -> User | None:
+        cached = user_cache.get(id)
+        if cached is not None:
+            # load=False copies the snapshot into this session without a SELECT.
+            return await self.session.merge(cached, load=False)
+
+        user = await super().get(id)
+        if user is not None:
+            user_cache.set(id, detached_copy(user))
+        return user
 
-@event.listens_for(PracticeSession, 'before_update')
-@event.listens_for(PracticeSession, 'before_insert')
-def before_insert_practice_session(mapper, connection, target: PracticeSession):
-   target.calculate_session_duration()
\ No newline at end of file
+    async def update(self, user: User, update_dict: dict) -> User:
+        user_cache.pop(user.id)
+        return await super().update(user, update_dict)
+
+    async def delete(self, user: User) -> None:
+        user_cache.pop(user.id)
+        await super().delete(user)
+
+async def get_user_db(session: AsyncSession = Depends(get_async_session)):
+    yield CachedUserDatabase(session, User)
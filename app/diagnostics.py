@@ -0,0 +1,120 @@
+"""
+Opt-in query diagnostics (DIAGNOSTICS_ENABLED=true).
+
+- Statements slower than SLOW_QUERY_MS are logged with their SQL and the route that ran them.
+- A statement run QUERY_REPEAT_THRESHOLD or more times in one request is logged, which is
+  what an N+1 from a lazy relationship looks like.
+- Requests that run more queries than their route's budget are logged, or raise
+  QueryBudgetExceeded when QUERY_BUDGET_STRICT is on, so a test client sees the failure.
+
+Budgets are declared on endpoints with @query_budget(n) and count every query the request
+runs, including loading the user on a user cache miss. Routes without one get
+DEFAULT_QUERY_BUDGET. In tests, the budgeted_client fixture enforces them.
+"""
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from app.metrics import route_label
+from app.settings import SLOW_QUERY_MS, QUERY_REPEAT_THRESHOLD, DEFAULT_QUERY_BUDGET, QUERY_BUDGET_STRICT
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+import logging
+
+logger = logging.getLogger("app.diagnostics")
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+@dataclass
+class RequestQueries:
+    scope: dict
+    statements: Counter[str] = field(default_factory=Counter)
+
+    @property
+    def count(self) -> int:
+        return self.statements.total()
+
+current_queries: ContextVar[RequestQueries | None] = ContextVar("current_queries", default=None)
+
+# Module-level so tests can flip it with enforce_query_budgets() without reloading settings.
+strict = QUERY_BUDGET_STRICT
+
+def query_budget(limit: int | None) -> Callable:
+    """
+    Declare how many queries a request to this endpoint may run. Goes under the route decorator.
+    None means the count depends on the input, as with imports, and isn't checked.
+    """
+    def decorate(endpoint: Callable) -> Callable:
+        endpoint.query_budget = limit
+        return endpoint
+    return decorate
+
+def route_budget(scope: dict) -> int | None:
+    endpoint = scope.get("endpoint")
+    return getattr(endpoint, "query_budget", DEFAULT_QUERY_BUDGET)
+
+@contextmanager
+def enforce_query_budgets() -> Iterator[None]:
+    """Raise QueryBudgetExceeded for requests over budget while the block runs."""
+    global strict
+    previous, strict = strict, True
+    try:
+        yield
+    finally:
+        strict = previous
+
+class DiagnosticsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = RequestQueries(scope)
+        token = current_queries.set(queries)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_queries.reset(token)
+
+        check_request(queries)
+
+def check_request(queries: RequestQueries) -> None:
+    route = f"{queries.scope['method']} {route_label(queries.scope)}"
+
+    for statement, count in queries.statements.items():
+        if count >= QUERY_REPEAT_THRESHOLD:
+            logger.warning("%s ran the same statement %d times: %s", route, count, statement)
+
+    budget = route_budget(queries.scope)
+    if budget is not None and queries.count > budget:
+        message = f"{route} ran {queries.count} queries, over its budget of {budget}."
+        if strict:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._diagnostics_start = perf_counter()
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    queries = current_queries.get()
+    if queries is not None:
+        queries.statements[statement] += 1
+
+    start = getattr(context, "_diagnostics_start", None)
+    if start is None:
+        return
+    elapsed_ms = (perf_counter() - start) * 1000
+    if elapsed_ms >= SLOW_QUERY_MS:
+        route = f"{queries.scope['method']} {route_label(queries.scope)}" if queries else "outside a request"
+        logger.warning("Slow query (%.1f ms) from %s: %s", elapsed_ms, route, statement)
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
@@ -0,0 +1,34 @@
+from sqlalchemy.ext.asyncio import AsyncResult
+from app.serialization import export_row_adapter
+from collections.abc import AsyncIterator
+import csv
+import io
+import zlib
+
+EXPORT_FIELDS = ["id", "date", "start_time", "end_time", "duration", "notes", "goal_id", "goal_title"]
+
+def csv_chunk(rows, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+def ndjson_chunk(rows) -> bytes:
+    return b"".join(export_row_adapter.dump_json(row._asdict()) + b"\n" for row in rows)
+
+async def encode_rows(result: AsyncResult, format: str) -> AsyncIterator[bytes]:
+    """One chunk per fetched partition, so only a partition is ever held in memory."""
+    if format == "csv":
+        yield csv_chunk([], header=True)
+    async for rows in result.partitions():
+        yield csv_chunk(rows) if format == "csv" else ndjson_chunk(rows)
+
+async def gzipped(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31)  # 31 writes a gzip header and trailer.
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
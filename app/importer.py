@@ -0,0 +1,162 @@
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.db import Goal, PracticeSession
+from app.schemas import NewPracticeSession, PracticeSessionImportError, PracticeSessionImportResult, validation_detail
+from app.settings import IMPORT_BATCH_SIZE, IMPORT_MAX_ERRORS
+from pydantic import ValidationError
+from typing import IO
+import csv
+import io
+import uuid
+
+REQUIRED_COLUMNS = {"date", "start_time", "end_time"}
+GOAL_TITLE_LENGTH = Goal.title.type.length
+COPY_COLUMNS = ["id", "date", "start_time", "end_time", "notes", "goal_id"]
+
+class ImportFormatError(ValueError):
+    pass
+
+def read_batch(reader: csv.DictReader, size: int) -> list[tuple[int, dict]]:
+    batch = []
+    for row in reader:
+        batch.append((reader.line_num, row))
+        if len(batch) == size:
+            break
+    return batch
+
+class SessionImporter:
+    """
+    Loads CSV rows into practice_session for one user, IMPORT_BATCH_SIZE rows at a time.
+
+    Each row names its goal by goal_id, or by goal_title. Titles the user has no goal for
+    get one, created with the batch that first needs it. Rows that fail validation are
+    counted and the first IMPORT_MAX_ERRORS are reported; the rest are copied in.
+    """
+
+    def __init__(self, db: AsyncSession, user_id: uuid.UUID):
+        self.db = db
+        self.user_id = user_id
+        self.goals_by_title: dict[str, uuid.UUID] = {}
+        self.owned_goals: set[uuid.UUID] = set()
+        self.imported = 0
+        self.goals_created = 0
+        self.rejected = 0
+        self.errors: list[PracticeSessionImportError] = []
+
+    def reject(self, line: int, detail: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append(PracticeSessionImportError(line=line, detail=detail))
+
+    async def run(self, file: IO[bytes]) -> PracticeSessionImportResult:
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        reader = csv.DictReader(text)
+        # Parsing is blocking file I/O and CPU, so keep it off the event loop.
+        columns = set(await run_in_threadpool(lambda: reader.fieldnames) or [])
+        missing = REQUIRED_COLUMNS - columns
+        if missing or not columns & {"goal_id", "goal_title"}:
+            raise ImportFormatError(
+                "CSV needs a header with date, start_time, end_time and goal_id or goal_title columns."
+            )
+
+        while batch := await run_in_threadpool(read_batch, reader, IMPORT_BATCH_SIZE):
+            await self.load(batch)
+
+        return PracticeSessionImportResult(
+            imported=self.imported,
+            goals_created=self.goals_created,
+            rejected=self.rejected,
+            errors=self.errors
+        )
+
+    async def resolve_goals(self, batch: list[tuple[int, dict]]) -> dict[str, uuid.UUID]:
+        """Look up the batch's goals in one query each way. Returns ids to use for new titles."""
+        ids = set()
+        for _, row in batch:
+            try:
+                ids.add(uuid.UUID(row.get("goal_id") or ""))
+            except ValueError:
+                pass
+        unknown_ids = ids - self.owned_goals
+        if unknown_ids:
+            stmt = select(Goal.id).where(Goal.user_id == self.user_id).where(Goal.id.in_(unknown_ids))
+            self.owned_goals.update(await self.db.scalars(stmt))
+
+        titles = {row["goal_title"].strip() for _, row in batch if not row.get("goal_id") and row.get("goal_title")}
+        unknown_titles = titles - self.goals_by_title.keys()
+        if unknown_titles:
+            stmt = (
+                select(Goal.title, Goal.id)
+                .where(Goal.user_id == self.user_id)
+                .where(Goal.title.in_(unknown_titles))
+                .order_by(Goal.id.desc())
+            )
+            # Descending, so with duplicate titles the lowest id is the one kept.
+            for title, id in await self.db.execute(stmt):
+                self.goals_by_title[title] = id
+                self.owned_goals.add(id)
+
+        return {title: uuid.uuid4() for title in unknown_titles - self.goals_by_title.keys()}
+
+    async def load(self, batch: list[tuple[int, dict]]) -> None:
+        new_goals = await self.resolve_goals(batch)
+        new_goal_ids = set(new_goals.values())
+        used_new_goals = {}
+        records = []
+
+        for line, row in batch:
+            title = (row.get("goal_title") or "").strip()
+            if row.get("goal_id"):
+                goal_id = row["goal_id"]
+            elif title in self.goals_by_title:
+                goal_id = self.goals_by_title[title]
+            elif title in new_goals:
+                if len(title) > GOAL_TITLE_LENGTH:
+                    self.reject(line, f"goal_title: at most {GOAL_TITLE_LENGTH} characters")
+                    continue
+                goal_id = new_goals[title]
+            else:
+                self.reject(line, "goal_id or goal_title is required.")
+                continue
+
+            try:
+                session = NewPracticeSession.model_validate({
+                    "date": row.get("date"),
+                    "start_time": row.get("start_time"),
+                    "end_time": row.get("end_time"),
+                    "notes": row.get("notes") or "",
+                    "goal_id": goal_id,
+                })
+            except ValidationError as e:
+                self.reject(line, validation_detail(e))
+                continue
+
+            if session.goal_id in new_goal_ids:
+                used_new_goals[title] = session.goal_id
+            elif session.goal_id not in self.owned_goals:
+                self.reject(line, "Goal not found.")
+                continue
+
+            records.append((
+                uuid.uuid4(), session.date, session.start_time, session.end_time, session.notes, session.goal_id
+            ))
+
+        # Only create goals some valid row needs, so a bad row can't leave an empty goal behind.
+        if used_new_goals:
+            await self.db.execute(insert(Goal), [
+                {"id": id, "user_id": self.user_id, "title": title, "description": "Imported"}
+                for title, id in used_new_goals.items()
+            ])
+            self.goals_by_title.update(used_new_goals)
+            self.owned_goals.update(used_new_goals.values())
+            self.goals_created += len(used_new_goals)
+
+        if records:
+            conn = await self.db.connection()
+            raw = await conn.get_raw_connection()
+            # COPY fires the statement-level rollup triggers like any other insert.
+            await raw.driver_connection.copy_records_to_table(
+                PracticeSession.__tablename__, records=records, columns=COPY_COLUMNS
+            )
+            self.imported += len(records)
@@ -0,0 +1,167 @@
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from contextvars import ContextVar
+from dataclasses import dataclass
+from time import perf_counter
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50)
+
+class Histogram:
+    """Prometheus-style histogram. Counts are kept per bucket and made cumulative on render."""
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+@dataclass(slots=True)
+class RequestStats:
+    queries: int = 0
+    db_time: float = 0.0
+
+# Set by MetricsMiddleware for the length of a request. The cursor listeners run in the
+# same context (SQLAlchemy's greenlets carry it over), so they can add to it directly.
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+class Registry:
+    def __init__(self):
+        self.in_flight = 0
+        self.latency: defaultdict[tuple[str, str], Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.db_time: defaultdict[tuple[str, str], Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries: defaultdict[tuple[str, str], Histogram] = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.responses: Counter[tuple[str, str, int]] = Counter()
+
+    def record(self, method: str, route: str, status: int, elapsed: float, stats: RequestStats) -> None:
+        key = (method, route)
+        self.latency[key].observe(elapsed)
+        self.db_time[key].observe(stats.db_time)
+        self.queries[key].observe(stats.queries)
+        self.responses[(method, route, status)] += 1
+
+registry = Registry()
+
+def route_label(scope: dict) -> str:
+    # The route template rather than the raw path, so ids don't each get their own series.
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+class MetricsMiddleware:
+    """Plain ASGI middleware, so the only per-request work is a few dict updates."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        registry.in_flight += 1
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - start
+            registry.in_flight -= 1
+            current_request.reset(token)
+            registry.record(scope["method"], route_label(scope), status, elapsed, stats)
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_request.get() is not None:
+        context._metrics_start = perf_counter()
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    start = getattr(context, "_metrics_start", None)
+    if start is not None:
+        stats.db_time += perf_counter() - start
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+def escape_label(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(labels: dict[str, object]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + "}"
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(value)
+
+def metric_header(name: str, kind: str, help: str) -> list[str]:
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+
+def render_histograms(name: str, help: str, histograms: dict[tuple[str, str], Histogram]) -> list[str]:
+    lines = metric_header(name, "histogram", help)
+    for (method, route), histogram in sorted(histograms.items()):
+        labels = {"method": method, "route": route}
+        cumulative = 0
+        for bound, count in zip((*histogram.bounds, float("inf")), histogram.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{format_labels({**labels, 'le': format_value(bound)})} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {format_value(histogram.sum)}")
+        lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+    return lines
+
+def render_samples(name: str, kind: str, help: str, samples: Iterable[tuple[dict, float]]) -> list[str]:
+    lines = metric_header(name, kind, help)
+    lines.extend(f"{name}{format_labels(labels)} {format_value(value)}" for labels, value in samples)
+    return lines
+
+def render(extra: Iterable[tuple[str, str, str, Iterable[tuple[dict, float]]]] = ()) -> str:
+    """
+    The registry in the Prometheus text format. `extra` adds (name, type, help, samples)
+    families read at scrape time, like cache and pool stats.
+    """
+    lines = render_samples(
+        "http_requests_in_flight", "gauge", "Requests currently being handled.",
+        [({}, registry.in_flight)]
+    )
+    lines += render_samples(
+        "http_responses_total", "counter", "Responses by route and status code.",
+        (
+            ({"method": method, "route": route, "status": status}, count)
+            for (method, route, status), count in sorted(registry.responses.items())
+        )
+    )
+    lines += render_histograms(
+        "http_request_duration_seconds", "Time spent handling each request.", registry.latency
+    )
+    lines += render_histograms(
+        "http_request_db_seconds", "Time spent waiting on database queries per request.", registry.db_time
+    )
+    lines += render_histograms(
+        "http_request_db_queries", "Database queries issued per request.", registry.queries
+    )
+    for name, kind, help, samples in extra:
+        lines += render_samples(name, kind, help, samples)
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,41 @@
+from fastapi import HTTPException
+from datetime import date
+import base64
+import json
+import uuid
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([str(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, count: int) -> list[str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+    if not isinstance(values, list) or len(values) != count or not all(isinstance(v, str) for v in values):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    return values
+
+def decode_id_cursor(cursor: str) -> uuid.UUID:
+    (last_id,) = decode_cursor(cursor, 1)
+    try:
+        return uuid.UUID(last_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+def decode_date_id_cursor(cursor: str) -> tuple[date, uuid.UUID]:
+    last_date, last_id = decode_cursor(cursor, 2)
+    try:
+        return date.fromisoformat(last_date), uuid.UUID(last_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+def decode_rank_id_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    last_rank, last_id = decode_cursor(cursor, 2)
+    try:
+        return float(last_rank), uuid.UUID(last_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
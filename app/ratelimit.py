@@ -0,0 +1,129 @@
+"""
+Per-user token buckets (RATE_LIMIT_ENABLED=true, the default).
+
+Each user gets a bucket of RATE_LIMIT_BURST tokens that refills at RATE_LIMIT_PER_SECOND.
+A request spends its route's cost, declared with @rate_cost(n) under the route decorator
+(1 otherwise), and gets a 429 with Retry-After when the bucket can't cover it. Requests
+without a valid token are keyed by client address instead. The user comes from the token's
+claims alone, so a request turned away here never reaches the database.
+
+Buckets live in the worker by default. Set RATE_LIMIT_REDIS_URL to share them between
+workers and hosts through Redis (`pip install redis`).
+"""
+from fastapi import HTTPException, Request
+from fastapi_users.jwt import decode_jwt
+from app.cache import TTLCache
+from app.users import get_jwt_strategy
+from app.settings import (
+    RATE_LIMIT_ENABLED, RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_MAX_KEYS, RATE_LIMIT_REDIS_URL
+)
+from collections.abc import Callable
+from time import monotonic
+from typing import Protocol
+import jwt
+import logging
+import math
+
+logger = logging.getLogger("app.ratelimit")
+
+class RateLimitBackend(Protocol):
+    async def take(self, key: str, cost: float) -> float:
+        """Spend `cost` tokens from `key`'s bucket. Returns 0, or the seconds until it could."""
+        ...
+
+class MemoryBackend:
+    def __init__(self, rate: float, burst: float, maxsize: int):
+        self.rate = rate
+        self.burst = burst
+        # An idle bucket is full again after burst / rate seconds, so it can be forgotten.
+        self._buckets = TTLCache(maxsize, burst / rate)
+
+    async def take(self, key: str, cost: float) -> float:
+        now = monotonic()
+        tokens, updated = self._buckets.get(key) or (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < cost:
+            return (cost - tokens) / self.rate
+        self._buckets.set(key, (tokens - cost, now))
+        return 0.0
+
+# Same bucket as MemoryBackend, run atomically in Redis against the server's clock.
+TAKE_SCRIPT = """
+local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = math.min(burst, (tonumber(state[1]) or burst) + (now - (tonumber(state[2]) or now)) * rate)
+if tokens < cost then
+    return tostring((cost - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - cost), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000))
+return '0'
+"""
+
+class RedisBackend:
+    def __init__(self, url: str, rate: float, burst: float):
+        import redis.asyncio as redis
+
+        self.rate = rate
+        self.burst = burst
+        self.errors = (redis.RedisError, OSError)
+        self._client = redis.from_url(url)
+        self._take = self._client.register_script(TAKE_SCRIPT)
+
+    async def take(self, key: str, cost: float) -> float:
+        try:
+            return float(await self._take(keys=[f"ratelimit:{key}"], args=[self.rate, self.burst, cost]))
+        except self.errors as e:
+            # Better to let requests through than to fail them all while Redis is away.
+            logger.warning("Rate limit backend unavailable, allowing request: %s", e)
+            return 0.0
+
+def make_backend() -> RateLimitBackend:
+    if RATE_LIMIT_REDIS_URL:
+        return RedisBackend(RATE_LIMIT_REDIS_URL, RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+    return MemoryBackend(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_MAX_KEYS)
+
+backend: RateLimitBackend = make_backend()
+
+def rate_cost(cost: float) -> Callable:
+    """Declare how many tokens a request to this endpoint spends. Goes under the route decorator."""
+    def decorate(endpoint: Callable) -> Callable:
+        endpoint.rate_cost = cost
+        return endpoint
+    return decorate
+
+def route_cost(scope: dict) -> float:
+    # Capped at the burst size, or the route could never be called at all.
+    return min(getattr(scope.get("endpoint"), "rate_cost", 1), RATE_LIMIT_BURST)
+
+jwt_strategy = get_jwt_strategy()
+
+def token_subject(request: Request) -> str | None:
+    """The user id from a valid bearer token, checked by signature only."""
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        claims = decode_jwt(token, jwt_strategy.decode_key, jwt_strategy.token_audience, [jwt_strategy.algorithm])
+    except jwt.PyJWTError:
+        return None
+    return claims.get("sub")
+
+async def rate_limit(request: Request) -> None:
+    """App-wide dependency. Runs after routing, so the route's cost is known, but before
+    the handler's own dependencies touch the database."""
+    cost = route_cost(request.scope)
+    if not RATE_LIMIT_ENABLED or cost <= 0:
+        return
+
+    subject = token_subject(request)
+    key = f"user:{subject}" if subject else f"ip:{request.client.host if request.client else 'unknown'}"
+    retry_after = await backend.take(key, cost)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests.",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
@@ -0,0 +1,88 @@
+from fastapi import Depends, Request
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, InterfaceError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.db import User, async_session_maker, replica_engines, get_async_session
+from app.users import current_active_user
+from app.cache import read_cache, client_wrote_recently
+from app.settings import (
+    REPLICA_STICKY_SECONDS, REPLICA_RETRY_INTERVAL, REPLICA_CHECK_INTERVAL, READINESS_TIMEOUT
+)
+from collections.abc import AsyncGenerator
+from time import monotonic
+import asyncio
+
+class ReplicaSet:
+    """
+    Round-robin over the replica engines, skipping any marked down.
+
+    A replica is marked down when a request on it fails to connect, or when the periodic
+    check fails. It's tried again after REPLICA_RETRY_INTERVAL or the next passing check.
+    """
+
+    def __init__(self, engines: list[AsyncEngine]):
+        self.engines = engines
+        self._next = 0
+        self._down_until: dict[AsyncEngine, float] = {}
+
+    def healthy(self) -> list[AsyncEngine]:
+        now = monotonic()
+        return [e for e in self.engines if self._down_until.get(e, 0) <= now]
+
+    def choose(self) -> AsyncEngine | None:
+        healthy = self.healthy()
+        if not healthy:
+            return None
+        self._next = (self._next + 1) % len(healthy)
+        return healthy[self._next]
+
+    def mark_down(self, engine: AsyncEngine) -> None:
+        self._down_until[engine] = monotonic() + REPLICA_RETRY_INTERVAL
+
+    def mark_up(self, engine: AsyncEngine) -> None:
+        self._down_until.pop(engine, None)
+
+    async def check(self, engine: AsyncEngine) -> None:
+        try:
+            async with asyncio.timeout(READINESS_TIMEOUT):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            self.mark_up(engine)
+        except Exception:
+            self.mark_down(engine)
+
+    async def monitor(self) -> None:
+        while True:
+            await asyncio.gather(*(self.check(e) for e in self.engines))
+            await asyncio.sleep(REPLICA_CHECK_INTERVAL)
+
+replicas = ReplicaSet(replica_engines)
+
+async def get_read_session(
+    request: Request,
+    user: User = Depends(current_active_user),
+    primary: AsyncSession = Depends(get_async_session)
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session for read-only handlers. Uses a replica when one is configured and healthy,
+    except for REPLICA_STICKY_SECONDS after the user's last write, so they read it back
+    whichever worker served the write.
+    """
+    written_at = read_cache.written_at(user.id)
+    recently_wrote = (
+        (written_at is not None and monotonic() - written_at < REPLICA_STICKY_SECONDS)
+        or client_wrote_recently(request, REPLICA_STICKY_SECONDS)
+    )
+    engine = None if recently_wrote else replicas.choose()
+
+    if engine is None:
+        # The session authentication used, so a request never holds two primary connections.
+        yield primary
+        return
+
+    async with async_session_maker(bind=engine) as session:
+        try:
+            yield session
+        except (OperationalError, InterfaceError, OSError, TimeoutError):
+            replicas.mark_down(engine)
+            raise
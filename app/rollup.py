@@ -0,0 +1,59 @@
+from sqlalchemy import select, delete, insert, func, text
+from app.db import PracticeSession, PracticeDailyRollup, Goal, User, async_session_maker
+import argparse
+import asyncio
+
+async def rebuild_rollup(batch_size: int = 500) -> int:
+    """Recompute practice_daily_rollup from practice_session, batch_size users per transaction."""
+    rebuilt = 0
+    last_user_id = None
+
+    async with async_session_maker() as db:
+        while True:
+            stmt = select(User.id).order_by(User.id).limit(batch_size)
+            if last_user_id:
+                stmt = stmt.where(User.id > last_user_id)
+            user_ids = (await db.scalars(stmt)).all()
+
+            if not user_ids:
+                break
+
+            # Hold off the triggers while this batch is swapped, so no concurrent
+            # session write is counted twice or lost.
+            await db.execute(text("LOCK TABLE practice_daily_rollup IN SHARE ROW EXCLUSIVE MODE"))
+            await db.execute(
+                delete(PracticeDailyRollup).where(PracticeDailyRollup.user_id.in_(user_ids))
+            )
+            totals = (
+                select(
+                    Goal.user_id,
+                    PracticeSession.goal_id,
+                    PracticeSession.date,
+                    func.coalesce(func.sum(PracticeSession.duration), 0),
+                    func.count()
+                )
+                .join(Goal, PracticeSession.goal_id == Goal.id)
+                .where(Goal.user_id.in_(user_ids))
+                .where(PracticeSession.date.is_not(None))
+                .group_by(Goal.user_id, PracticeSession.goal_id, PracticeSession.date)
+            )
+            await db.execute(
+                insert(PracticeDailyRollup).from_select(
+                    ["user_id", "goal_id", "date", "total_minutes", "session_count"],
+                    totals
+                )
+            )
+            await db.commit()
+
+            rebuilt += len(user_ids)
+            last_user_id = user_ids[-1]
+            print(f"Rebuilt practice_daily_rollup for {rebuilt} users.")
+
+    return rebuilt
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rebuild practice_daily_rollup from practice_session.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Users per transaction.")
+    args = parser.parse_args()
+
+    asyncio.run(rebuild_rollup(args.batch_size))
@@ -1,9 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
-from ..db import Goal, get_async_session, User
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from ..db import Goal, GOAL_COLUMNS, PracticeSession, SESSION_COLUMNS, PracticeDailyRollup, get_async_session, User
 from ..users import current_active_user
-from ..schemas import NewGoal, SavedGoal, UpdateGoal
+from ..replicas import get_read_session
+from ..diagnostics import query_budget
+from ..schemas import NewGoal, SavedGoal, UpdateGoal, GoalDetail, GoalDetailPage, PracticeSessionPage
+from ..pagination import encode_cursor, decode_id_cursor, decode_date_id_cursor
+from ..cache import cached_response, read_cache
+from ..serialization import (
+    to_json, json_response, row_dicts, goal_adapter, goal_page_adapter, goal_detail_adapter,
+    goal_detail_page_adapter, update_goal_adapter, session_page_adapter
+)
+from ..settings import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, GOAL_EMBEDDED_SESSIONS
+from .sessions import sessions_stmt, owned_goal_stmt
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete, func, true
+from collections import defaultdict
 import uuid
 
 router = APIRouter(
@@ -11,81 +22,257 @@ router = APIRouter(
     tags = ["goals"]
 )
 
+def like_prefix(prefix: str) -> str:
+    # The whole pattern goes in as one parameter, rather than startswith()'s `:p || '%'`,
+    # so Postgres can turn it into a range on ix_goal_user_id_title.
+    return prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+def goals_stmt(
+    user_id: uuid.UUID,
+    limit: int,
+    after: uuid.UUID | None = None,
+    complete: bool | None = None,
+    title_prefix: str | None = None
+):
+    stmt = (
+        select(*GOAL_COLUMNS)
+        .where(Goal.user_id == user_id)
+        .order_by(Goal.id)
+        .limit(limit + 1)
+    )
+    if after:
+        stmt = stmt.where(Goal.id > after)
+    if complete is not None:
+        stmt = stmt.where(Goal.complete == complete)
+    if title_prefix:
+        stmt = stmt.where(Goal.title.like(like_prefix(title_prefix), escape="\\"))
+    return stmt
+
+def goal_stmt(user_id: uuid.UUID, id: uuid.UUID):
+    return select(*GOAL_COLUMNS).where(Goal.user_id == user_id).where(Goal.id == id)
+
+GOAL_INCLUDES = {"sessions", "totals"}
+
+def parse_include(include: str | None) -> set[str]:
+    includes = {part.strip() for part in include.split(",") if part.strip()} if include else set()
+    unknown = includes - GOAL_INCLUDES
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include: {', '.join(sorted(unknown))}. Choose from sessions, totals."
+        )
+    return includes
+
+def with_totals(stmt, user_id: uuid.UUID):
+    """Adds total_minutes and session_count to a goals statement, from one grouped pass over the rollup."""
+    totals = (
+        select(
+            PracticeDailyRollup.goal_id,
+            func.sum(PracticeDailyRollup.total_minutes).label("total_minutes"),
+            func.sum(PracticeDailyRollup.session_count).label("session_count")
+        )
+        .where(PracticeDailyRollup.user_id == user_id)
+        .group_by(PracticeDailyRollup.goal_id)
+        .subquery()
+    )
+    return (
+        stmt.outerjoin(totals, totals.c.goal_id == Goal.id)
+        .add_columns(
+            func.coalesce(totals.c.total_minutes, 0).label("total_minutes"),
+            func.coalesce(totals.c.session_count, 0).label("session_count")
+        )
+    )
+
+def embedded_sessions_stmt(goal_ids: list[uuid.UUID], per_goal: int):
+    """
+    The latest `per_goal` sessions of each goal, newest first. The same IN query selectinload
+    on Goal.practice_session_entry would run, capped per goal with a LATERAL LIMIT. That
+    reads each goal's index range backwards and stops after `per_goal` rows, where a
+    row_number() window would have to read every session of every goal first.
+    """
+    latest = (
+        select(*SESSION_COLUMNS)
+        .where(PracticeSession.goal_id == Goal.id)
+        .order_by(PracticeSession.date.desc(), PracticeSession.id.desc())
+        .limit(per_goal)
+        .lateral()
+    )
+    return (
+        select(*(latest.c[column.key] for column in SESSION_COLUMNS))
+        .select_from(Goal)
+        .join(latest, true())
+        .where(Goal.id.in_(goal_ids))
+        .order_by(latest.c.goal_id, latest.c.date.desc(), latest.c.id.desc())
+    )
+
+async def goal_details(db: AsyncSession, goals: list, includes: set[str]) -> list[dict]:
+    sessions = defaultdict(list)
+    if "sessions" in includes and goals:
+        result = await db.execute(embedded_sessions_stmt([goal.id for goal in goals], GOAL_EMBEDDED_SESSIONS))
+        for row in result:
+            sessions[row.goal_id].append(row._asdict())
+
+    items = []
+    for goal in goals:
+        item = goal._asdict()
+        item["totals"] = None
+        if "totals" in includes:
+            item["totals"] = {"total_minutes": item.pop("total_minutes"), "session_count": item.pop("session_count")}
+        item["sessions"] = sessions[goal.id] if "sessions" in includes else None
+        items.append(item)
+    return items
+
 @router.get("/")
+@query_budget(3)
 async def get_goal(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    include: str | None = Query(None, description="Comma separated: sessions, totals."),
+    complete: bool | None = None,
+    title_prefix: str | None = Query(None, min_length=1, max_length=100),
     user: User = Depends(current_active_user),
-    db: AsyncSession = Depends(get_async_session)
-) -> list[SavedGoal]:
-    stmt = select(Goal).where(Goal.user_id == user.id)
-    result = await db.scalars(stmt)
-    goals = result.all()
+    db: AsyncSession = Depends(get_read_session)
+) -> GoalDetailPage:
+    includes = parse_include(include)
+    filtered = complete is not None or title_prefix is not None
 
-    if not goals:
-        raise HTTPException(status_code=404, detail="No goals. Go set some goals!")
-    
-    return [SavedGoal.model_validate(g, from_attributes=True) for g in goals]
+    async def build() -> bytes:
+        after = decode_id_cursor(cursor) if cursor else None
+        stmt = goals_stmt(user.id, limit, after, complete, title_prefix)
+        if "totals" in includes:
+            stmt = with_totals(stmt, user.id)
+        result = await db.execute(stmt)
+        goals = result.all()
+
+        if not goals and not cursor and not filtered:
+            raise HTTPException(status_code=404, detail="No goals. Go set some goals!")
+
+        next_cursor = None
+        if len(goals) > limit:
+            goals = goals[:limit]
+            next_cursor = encode_cursor(goals[-1].id)
+
+        if not includes:
+            return to_json(goal_page_adapter, {"items": row_dicts(goals), "next_cursor": next_cursor})
+
+        items = await goal_details(db, goals, includes)
+        return to_json(goal_detail_page_adapter, {"items": items, "next_cursor": next_cursor})
+
+    return await cached_response(request, user.id, build)
 
 @router.get("/{id}")
+@query_budget(3)
 async def get_goal(
     id: uuid.UUID,
-    db: AsyncSession = Depends(get_async_session),
+    request: Request,
+    include: str | None = Query(None, description="Comma separated: sessions, totals."),
+    db: AsyncSession = Depends(get_read_session),
     user: User = Depends(current_active_user)
-) -> SavedGoal:
-    stmt = select(Goal).where(Goal.user_id == user.id).where(Goal.id == id)
-    result = await db.scalars(stmt)
-    goal = result.one_or_none()
+) -> GoalDetail:
+    includes = parse_include(include)
 
-    if not goal:
-        raise HTTPException(status_code=404, detail="Goal not found.")
-    
-    return SavedGoal.model_validate(goal, from_attributes=True)
+    async def build() -> bytes:
+        stmt = goal_stmt(user.id, id)
+        if "totals" in includes:
+            stmt = with_totals(stmt, user.id)
+        result = await db.execute(stmt)
+        goal = result.one_or_none()
+
+        if not goal:
+            raise HTTPException(status_code=404, detail="Goal not found.")
+
+        if not includes:
+            return to_json(goal_adapter, goal._asdict())
+
+        (item,) = await goal_details(db, [goal], includes)
+        return to_json(goal_detail_adapter, item)
+
+    return await cached_response(request, user.id, build)
+
+@router.get("/{id}/sessions")
+@query_budget(3)
+async def get_goal_sessions(
+    id: uuid.UUID,
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user)
+) -> PracticeSessionPage:
+    async def build() -> bytes:
+        after = decode_date_id_cursor(cursor) if cursor else None
+        result = await db.execute(sessions_stmt(user.id, limit, after, goal_id=id))
+        sessions = result.all()
+
+        # An empty first page is either a goal with no sessions or someone else's goal.
+        if not sessions and not cursor and await db.scalar(owned_goal_stmt(user.id, id)) is None:
+            raise HTTPException(status_code=404, detail="Goal not found.")
+
+        next_cursor = None
+        if len(sessions) > limit:
+            sessions = sessions[:limit]
+            next_cursor = encode_cursor(sessions[-1].date, sessions[-1].id)
+
+        return to_json(session_page_adapter, {"items": row_dicts(sessions), "next_cursor": next_cursor})
+
+    return await cached_response(request, user.id, build)
 
 @router.post("/new", status_code=201)
+@query_budget(2)
 async def make_goal(
     goal: NewGoal,
     db: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_active_user)
 ) -> SavedGoal:
     try:
-        new_goal = Goal(
-            user_id = user.id,
-            **goal.model_dump()
+        stmt = (
+            insert(Goal)
+            .values(user_id=user.id, **goal.model_dump())
+            .returning(*GOAL_COLUMNS)
         )
-        db.add(new_goal)
+        result = await db.execute(stmt)
+        new_goal = result.one()
         await db.commit()
-        await db.refresh(new_goal)
-        return SavedGoal.model_validate(new_goal, from_attributes=True)
+        read_cache.bump(user.id)
+        return json_response(goal_adapter, new_goal._asdict(), status_code=201)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
 @router.patch("/complete/{id}", status_code=200)
+@query_budget(2)
 async def complete_goal(
     id: uuid.UUID,
     goal_data: UpdateGoal,
     db: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_active_user)
 ) -> SavedGoal:
-    stmt = select(Goal).where(Goal.id == id)
+    update_data = goal_data.model_dump(exclude_unset=True)
+    if update_data:
+        stmt = (
+            update(Goal)
+            .where(Goal.id == id)
+            .where(Goal.user_id == user.id)
+            .values(**update_data)
+            .returning(*GOAL_COLUMNS)
+        )
+    else:
+        stmt = select(*GOAL_COLUMNS).where(Goal.id == id).where(Goal.user_id == user.id)
+
     result = await db.execute(stmt)
-    db_result = result.scalar_one_or_none()
+    db_result = result.one_or_none()
 
     if not db_result:
         raise HTTPException(status_code=404, detail="Goal not found.")
 
-    if db_result.user_id != user.id:
-        raise HTTPException(status_code=401, detail="Not your goal. Cannot update.")
-    
-    update_data = goal_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_result, key, value)
-
     await db.commit()
-    await db.refresh(db_result)
+    read_cache.bump(user.id)
 
-    return SavedGoal.model_validate(db_result, from_attributes=True)
+    return json_response(goal_adapter, db_result._asdict())
 
 @router.put("/update/{id}", status_code=200)
+@query_budget(2)
 async def update_goal(
     id: uuid.UUID,
     goal: UpdateGoal,
@@ -93,40 +280,42 @@ async def update_goal(
     user: User = Depends(current_active_user)
 
 ) -> UpdateGoal:
-    stmt = select(Goal).where(Goal.id == id)
+    stmt = (
+        update(Goal)
+        .where(Goal.id == id)
+        .where(Goal.user_id == user.id)
+        .values(**goal.model_dump())
+        .returning(*GOAL_COLUMNS)
+    )
     result = await db.execute(stmt)
-    db_result = result.scalar_one_or_none()
+    db_result = result.one_or_none()
 
     if not db_result:
         raise HTTPException(status_code=404, detail="Goal not found.")
-    
-    if db_result.user_id != user.id:
-        raise HTTPException(status_code=401, detail="Not your goal. Unauthorized.")
-    
-    update_data = goal.model_dump()
-    for key, value in update_data.items():
-        setattr(db_result, key, value)
 
     await db.commit()
-    await db.refresh(db_result)
+    read_cache.bump(user.id)
 
-    return UpdateGoal.model_validate(db_result, from_attributes=True)
+    return json_response(update_goal_adapter, db_result._asdict())
 
 @router.delete("/delete/{id}", status_code=204)
+@query_budget(2)
 async def delete_goal(
     id: uuid.UUID,
     user: User = Depends(current_active_user),
     db: AsyncSession = Depends(get_async_session)
 ) -> None:
-    stmt = select(Goal).where(Goal.id == id)
-    result = await db.execute(stmt)
-    deleted_goal = result.scalar_one_or_none()
+    # Sessions and rollup rows go with it through ON DELETE CASCADE.
+    stmt = (
+        delete(Goal)
+        .where(Goal.id == id)
+        .where(Goal.user_id == user.id)
+        .returning(Goal.id)
+    )
+    deleted_id = await db.scalar(stmt)
 
-    if not deleted_goal:
+    if not deleted_id:
         raise HTTPException(status_code=404, detail="Goal not found.")
 
-    if deleted_goal.user_id != user.id:
-        raise HTTPException(status_code=401, detail="Not your goal. Unauthorized.")
-    
-    await db.delete(deleted_goal)
-    await db.commit()
\ No newline at end of file
+    await db.commit()
+    read_cache.bump(user.id)
\ No newline at end of file
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Response
+from ..db import engine
+from ..ratelimit import rate_cost
+from ..schemas import PoolStatus, Readiness
+from ..settings import READINESS_TIMEOUT
+from sqlalchemy import text
+from time import perf_counter
+import asyncio
+
+router = APIRouter(
+    prefix="/health",
+    tags=["health"]
+)
+
+def pool_status() -> PoolStatus:
+    pool = engine.pool
+    return PoolStatus(
+        size=pool.size(),
+        checked_in=pool.checkedin(),
+        checked_out=pool.checkedout(),
+        overflow=max(pool.overflow(), 0)
+    )
+
+@router.get("/live")
+@rate_cost(0)
+async def live() -> dict:
+    return {"status": "ok"}
+
+@router.get("/ready")
+@rate_cost(0)
+async def ready(response: Response) -> Readiness:
+    start = perf_counter()
+    try:
+        async with asyncio.timeout(READINESS_TIMEOUT):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        latency = round((perf_counter() - start) * 1000, 3)
+        status = "ok"
+
+    except Exception:
+        latency = None
+        status = "unavailable"
+        response.status_code = 503
+
+    return Readiness(status=status, db_latency_ms=latency, pool=pool_status())
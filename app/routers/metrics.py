@@ -0,0 +1,33 @@
+from fastapi import APIRouter, Response
+from ..cache import read_cache
+from ..db import user_cache
+from ..metrics import render
+from ..replicas import replicas
+from .health import pool_status
+from ..ratelimit import rate_cost
+from ..loadshed import pool_waits
+
+router = APIRouter(tags=["metrics"])
+
+def cache_families() -> list:
+    read = read_cache.stats()
+    pool = pool_status()
+    return [
+        ("read_cache_hits_total", "counter", "Cached GET responses served.", [({}, read["hits"])]),
+        ("read_cache_misses_total", "counter", "GET responses built because nothing was cached.", [({}, read["misses"])]),
+        ("read_cache_entries", "gauge", "Responses held in the read cache.", [({}, read["entries"])]),
+        ("user_cache_hits_total", "counter", "Authenticated users served from the user cache.", [({}, user_cache.hits)]),
+        ("user_cache_misses_total", "counter", "Authenticated users loaded from the database.", [({}, user_cache.misses)]),
+        ("user_cache_entries", "gauge", "Users held in the user cache.", [({}, len(user_cache))]),
+        ("db_pool_size", "gauge", "Connections the pool keeps open.", [({}, pool.size)]),
+        ("db_pool_checked_out", "gauge", "Connections in use.", [({}, pool.checked_out)]),
+        ("db_pool_overflow", "gauge", "Connections open beyond the pool size.", [({}, pool.overflow)]),
+        ("db_pool_standing_wait_seconds", "gauge", "Shortest connection checkout wait in the last load shedding window.", [({}, pool_waits.standing_wait())]),
+        ("db_replicas", "gauge", "Configured read replicas.", [({}, len(replicas.engines))]),
+        ("db_replicas_healthy", "gauge", "Read replicas currently taking reads.", [({}, len(replicas.healthy()))]),
+    ]
+
+@router.get("/metrics", include_in_schema=False)
+@rate_cost(0)
+async def metrics() -> Response:
+    return Response(content=render(cache_families()), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, Query, Request
+from ..db import Goal, GOAL_COLUMNS, PracticeSession, SESSION_COLUMNS, User
+from ..users import current_active_user
+from ..replicas import get_read_session
+from ..diagnostics import query_budget
+from ..ratelimit import rate_cost
+from ..schemas import GoalSearchPage, PracticeSessionSearchPage
+from ..pagination import encode_cursor, decode_rank_id_cursor
+from ..cache import cached_response
+from ..serialization import to_json, row_dicts, goal_search_page_adapter, session_search_page_adapter
+from ..settings import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, literal_column, or_, and_
+
+router = APIRouter(
+    prefix="/search",
+    tags=["search"]
+)
+
+# Must match the configuration the generated search columns are built with, or the GIN
+# indexes can't be used. Inlined because a bound parameter would arrive as varchar.
+ENGLISH = literal_column("'english'::regconfig")
+
+def ranked(stmt, search_column, id_column, q: str, limit: int, cursor: str | None):
+    """Filter `stmt` to rows matching `q`, best match first, then by id for a stable order."""
+    query = func.websearch_to_tsquery(ENGLISH, q)
+    rank = func.ts_rank(search_column, query)
+    stmt = (
+        stmt.add_columns(rank.label("rank"))
+        .where(search_column.op("@@")(query))
+        .order_by(rank.desc(), id_column)
+        .limit(limit + 1)
+    )
+    if cursor:
+        last_rank, last_id = decode_rank_id_cursor(cursor)
+        stmt = stmt.where(or_(rank < last_rank, and_(rank == last_rank, id_column > last_id)))
+    return stmt
+
+def page(rows, limit: int) -> dict:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].rank, rows[-1].id)
+    return {"items": row_dicts(rows), "next_cursor": next_cursor}
+
+@router.get("/sessions")
+@query_budget(2)
+@rate_cost(2)
+async def search_practice_sessions(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user)
+) -> PracticeSessionSearchPage:
+    async def build() -> bytes:
+        stmt = (
+            select(*SESSION_COLUMNS)
+            .join(Goal, PracticeSession.goal_id == Goal.id)
+            .where(Goal.user_id == user.id)
+        )
+        stmt = ranked(stmt, PracticeSession.search, PracticeSession.id, q, limit, cursor)
+        result = await db.execute(stmt)
+        return to_json(session_search_page_adapter, page(result.all(), limit))
+
+    return await cached_response(request, user.id, build)
+
+@router.get("/goals")
+@query_budget(2)
+@rate_cost(2)
+async def search_goals(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user)
+) -> GoalSearchPage:
+    async def build() -> bytes:
+        stmt = select(*GOAL_COLUMNS).where(Goal.user_id == user.id)
+        stmt = ranked(stmt, Goal.search, Goal.id, q, limit, cursor)
+        result = await db.execute(stmt)
+        return to_json(goal_search_page_adapter, page(result.all(), limit))
+
+    return await cached_response(request, user.id, build)
@@ -1,9 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends
-from ..db import PracticeSession, get_async_session, User, Goal
+from fastapi import APIRouter, HTTPException, Depends, Query, Body, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from ..db import PracticeSession, SESSION_COLUMNS, get_async_session, User, Goal
 from ..users import current_active_user
-from ..schemas import NewPracticeSession, SavedPracticeSession, UpdatePracticeSession
+from ..replicas import get_read_session
+from ..diagnostics import query_budget
+from ..ratelimit import rate_cost
+from ..schemas import (
+    NewPracticeSession, SavedPracticeSession, UpdatePracticeSession, PracticeSessionPage,
+    BulkPracticeSessionError, BulkPracticeSessionResult, PracticeSessionImportResult, validation_detail
+)
+from ..pagination import encode_cursor, decode_date_id_cursor
+from ..cache import cached_response, read_cache
+from ..serialization import to_json, json_response, row_dicts, session_adapter, session_page_adapter, bulk_result_adapter
+from ..settings import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, BULK_MAX_ROWS, EXPORT_FETCH_SIZE
+from ..export import encode_rows, gzipped
+from ..importer import SessionImporter, ImportFormatError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete, tuple_
+from pydantic import ValidationError
+from datetime import date
+import csv
+from typing import Any, Literal
 import uuid
 
 router = APIRouter(
@@ -11,92 +28,260 @@ router = APIRouter(
     tags=["practice_sessions"]
 )
 
+def owned_by(user_id: uuid.UUID):
+    return PracticeSession.goal_id.in_(select(Goal.id).where(Goal.user_id == user_id))
+
+def sessions_stmt(
+    user_id: uuid.UUID,
+    limit: int,
+    after: tuple[date, uuid.UUID] | None = None,
+    goal_id: uuid.UUID | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    descending: bool = False
+):
+    # Every filter is a plain comparison on an indexed column, so with goal_id the whole
+    # page is one range of ix_practice_session_goal_id_date_id, read in either direction.
+    key = tuple_(PracticeSession.date, PracticeSession.id)
+    order = (PracticeSession.date.desc(), PracticeSession.id.desc()) if descending else (PracticeSession.date, PracticeSession.id)
+    stmt = (
+        select(*SESSION_COLUMNS)
+        .join(Goal, PracticeSession.goal_id == Goal.id)
+        .where(Goal.user_id == user_id)
+        .order_by(*order)
+        .limit(limit + 1)
+    )
+    if after:
+        stmt = stmt.where(key < after if descending else key > after)
+    if goal_id:
+        stmt = stmt.where(PracticeSession.goal_id == goal_id)
+    if date_from:
+        stmt = stmt.where(PracticeSession.date >= date_from)
+    if date_to:
+        stmt = stmt.where(PracticeSession.date <= date_to)
+    return stmt
+
+def session_stmt(user_id: uuid.UUID, id: uuid.UUID):
+    return (
+        select(*SESSION_COLUMNS)
+        .join(Goal, PracticeSession.goal_id == Goal.id)
+        .where(Goal.user_id == user_id)
+        .where(PracticeSession.id == id)
+    )
+
+def owned_goal_stmt(user_id: uuid.UUID, goal_id: uuid.UUID):
+    return select(Goal.id).where(Goal.user_id == user_id).where(Goal.id == goal_id)
+
 @router.get('/')
+@query_budget(2)
 async def get_practice_session(
-    db: AsyncSession = Depends(get_async_session),
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    goal_id: uuid.UUID | None = None,
+    order: Literal["asc", "desc"] = "asc",
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user)
+) -> PracticeSessionPage:
+    filtered = date_from is not None or date_to is not None or goal_id is not None
+
+    async def build() -> bytes:
+        after = decode_date_id_cursor(cursor) if cursor else None
+        stmt = sessions_stmt(user.id, limit, after, goal_id, date_from, date_to, descending=order == "desc")
+        result = await db.execute(stmt)
+        db_result = result.all()
+
+        if not db_result and not cursor and not filtered:
+            raise HTTPException(status_code=404, detail="No practice sessions. Go practice!")
+
+        next_cursor = None
+        if len(db_result) > limit:
+            db_result = db_result[:limit]
+            next_cursor = encode_cursor(db_result[-1].date, db_result[-1].id)
+
+        return to_json(session_page_adapter, {"items": row_dicts(db_result), "next_cursor": next_cursor})
+
+    return await cached_response(request, user.id, build)
+
+# Declared before /{id}, which would otherwise try to parse "export" as an id.
+@router.get('/export')
+@query_budget(2)
+@rate_cost(20)
+async def export_practice_sessions(
+    format: Literal["csv", "ndjson"] = "csv",
+    gzip: bool = False,
+    db: AsyncSession = Depends(get_read_session),
     user: User = Depends(current_active_user)
-) -> list[SavedPracticeSession]:
+) -> StreamingResponse:
     stmt = (
-        select(PracticeSession)
+        select(*SESSION_COLUMNS, Goal.title.label("goal_title"))
         .join(Goal, PracticeSession.goal_id == Goal.id)
         .where(Goal.user_id == user.id)
+        .order_by(PracticeSession.date, PracticeSession.id)
+        .execution_options(yield_per=EXPORT_FETCH_SIZE)
     )
-    result = await db.scalars(stmt)
-    db_result = result.all()
+    # A server-side cursor, fetched EXPORT_FETCH_SIZE rows at a time while the response is sent.
+    result = await db.stream(stmt)
 
-    if not db_result:
-        raise HTTPException(status_code=404, detail="No practice sessions. Go practice!")
-    
-    return [SavedPracticeSession.model_validate(r, from_attributes=True) for r in db_result]
+    chunks = encode_rows(result, format)
+    filename = f"practice_sessions.{format}"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    if gzip:
+        chunks = gzipped(chunks)
+        filename += ".gz"
+        media_type = "application/gzip"
+
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @router.get('/{id}')
+@query_budget(2)
 async def get_practice_session(
     id: uuid.UUID,
-    db: AsyncSession = Depends(get_async_session),
+    request: Request,
+    db: AsyncSession = Depends(get_read_session),
     user: User = Depends(current_active_user)
 ) -> SavedPracticeSession:
-    stmt = (
-        select(PracticeSession)
-        .join(Goal, PracticeSession.goal_id == Goal.id)
-        .where(Goal.user_id == user.id)
-        .where(PracticeSession.id == id)
-    )
-    result = await db.execute(stmt)
-    db_result = result.scalar_one_or_none()
+    async def build() -> bytes:
+        result = await db.execute(session_stmt(user.id, id))
+        db_result = result.one_or_none()
 
-    if not db_result:
-        raise HTTPException(status_code=404, detail="Practice session not found.")
-    
-    return SavedPracticeSession.model_validate(db_result, from_attributes=True)
+        if not db_result:
+            raise HTTPException(status_code=404, detail="Practice session not found.")
+
+        return to_json(session_adapter, db_result._asdict())
+
+    return await cached_response(request, user.id, build)
 
 
 @router.post('/new', status_code=201)
+@query_budget(3)
 async def new_practice_session(
     practice_session: NewPracticeSession,
-    db: AsyncSession = Depends(get_async_session)
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_active_user)
 ) -> SavedPracticeSession:
+    if not await db.scalar(owned_goal_stmt(user.id, practice_session.goal_id)):
+        raise HTTPException(status_code=404, detail="Goal not found.")
+
     try:
-        new_log = PracticeSession(
-            **practice_session.model_dump()
+        stmt = (
+            insert(PracticeSession)
+            .values(**practice_session.model_dump())
+            .returning(*SESSION_COLUMNS)
         )
-        db.add(new_log)
+        result = await db.execute(stmt)
+        new_log = result.one()
         await db.commit()
-        await db.refresh(new_log)
-        return SavedPracticeSession.model_validate(new_log, from_attributes=True)
+        read_cache.bump(user.id)
+        return json_response(session_adapter, new_log._asdict(), status_code=201)
 
     except Exception as e:
         raise HTTPException(status_code=404, detail=f"Session not saved. {str(e)}")
 
+@router.post('/bulk', status_code=201)
+@query_budget(3)
+@rate_cost(5)
+async def bulk_practice_sessions(
+    practice_sessions: list[Any] = Body(...),
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_active_user)
+) -> BulkPracticeSessionResult:
+    if len(practice_sessions) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Too many sessions. Send at most {BULK_MAX_ROWS} per batch.")
+    if not practice_sessions:
+        raise HTTPException(status_code=422, detail="No sessions to save.")
+
+    errors = []
+    valid = []
+    for index, raw in enumerate(practice_sessions):
+        try:
+            valid.append((index, NewPracticeSession.model_validate(raw)))
+        except ValidationError as e:
+            errors.append(BulkPracticeSessionError(index=index, detail=validation_detail(e)))
+
+    goal_ids = {s.goal_id for _, s in valid}
+    owned_goals = set()
+    if goal_ids:
+        stmt = select(Goal.id).where(Goal.user_id == user.id).where(Goal.id.in_(goal_ids))
+        owned_goals = set(await db.scalars(stmt))
+
+    rows = []
+    for index, s in valid:
+        if s.goal_id not in owned_goals:
+            errors.append(BulkPracticeSessionError(index=index, detail="Goal not found."))
+            continue
+        rows.append(s.model_dump())
+
+    created = []
+    if rows:
+        try:
+            stmt = insert(PracticeSession).returning(*SESSION_COLUMNS, sort_by_parameter_order=True)
+            result = await db.execute(stmt, rows)
+            created = row_dicts(result)
+            await db.commit()
+            read_cache.bump(user.id)
+
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Sessions not saved. {str(e)}")
+
+    errors.sort(key=lambda e: e.index)
+    # 201 once anything was saved, even if some rows were rejected. A batch where every row
+    # was rejected wrote nothing, so it gets the errors with a 422.
+    return json_response(bulk_result_adapter, {"created": created, "errors": errors}, status_code=201 if created else 422)
+
+@router.post('/import', status_code=201)
+@query_budget(None)
+@rate_cost(50)
+async def import_practice_sessions(
+    file: UploadFile,
+    db: AsyncSession = Depends(get_async_session),
+    user: User = Depends(current_active_user)
+) -> PracticeSessionImportResult:
+    # The whole file goes in one transaction, so a failure part way leaves nothing behind.
+    try:
+        result = await SessionImporter(db, user.id).run(file.file)
+        await db.commit()
+    except (ImportFormatError, UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read CSV. {str(e)}")
+
+    if result.imported or result.goals_created:
+        read_cache.bump(user.id)
+    return result
+
 @router.put("/update/{id}", status_code=200)
+@query_budget(2)
 async def update_practice_session(
     id: uuid.UUID,
     session_data: UpdatePracticeSession,
     db: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_active_user)
 ) -> SavedPracticeSession:
-    
     stmt = (
-        select(PracticeSession)
-        .join(Goal, PracticeSession.goal_id == Goal.id)
-        .where(Goal.user_id == user.id)
+        update(PracticeSession)
         .where(PracticeSession.id == id)
+        .where(owned_by(user.id))
+        .values(**session_data.model_dump())
+        .returning(*SESSION_COLUMNS)
     )
     result = await db.execute(stmt)
-    db_result = result.scalar_one_or_none()
+    db_result = result.one_or_none()
 
     if not db_result:
         raise HTTPException(status_code=404, detail="Practice session not found.")
-    
-    update_data = session_data.model_dump()
-    for key, value in update_data.items():
-        setattr(db_result, key, value)
 
     await db.commit()
-    await db.refresh(db_result)
+    read_cache.bump(user.id)
 
-    return SavedPracticeSession.model_validate(db_result, from_attributes=True)
+    return json_response(session_adapter, db_result._asdict())
 
 @router.patch("/update/{id}", status_code=200)
+@query_budget(2)
 async def edit_practice_session(
     id: uuid.UUID,
     session_data: UpdatePracticeSession,
@@ -104,44 +289,46 @@ async def edit_practice_session(
     user: User = Depends(current_active_user)
 
 ) -> SavedPracticeSession:
-    stmt = (
-        select(PracticeSession)
-        .join(Goal, PracticeSession.goal_id == Goal.id)
-        .where(Goal.user_id == user.id)
-        .where(PracticeSession.id == id)
-    )
+    update_data = session_data.model_dump(exclude_unset=True)
+    if update_data:
+        stmt = (
+            update(PracticeSession)
+            .where(PracticeSession.id == id)
+            .where(owned_by(user.id))
+            .values(**update_data)
+            .returning(*SESSION_COLUMNS)
+        )
+    else:
+        stmt = select(*SESSION_COLUMNS).where(PracticeSession.id == id).where(owned_by(user.id))
+
     result = await db.execute(stmt)
-    db_result = result.scalar_one_or_none()
+    db_result = result.one_or_none()
 
     if not db_result:
         raise HTTPException(status_code=404, detail="Practice session not found.")
-    
-    update_data = session_data.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_result, key, value)
 
     await db.commit()
-    await db.refresh(db_result)
+    read_cache.bump(user.id)
 
-    return SavedPracticeSession.model_validate(db_result, from_attributes=True)
+    return json_response(session_adapter, db_result._asdict())
 
 @router.delete("/delete/{id}", status_code=204)
+@query_budget(2)
 async def delete_practice_session(
     id: uuid.UUID,
     db: AsyncSession = Depends(get_async_session),
     user: User = Depends(current_active_user)
 ) -> None:
     stmt = (
-        select(PracticeSession)
-        .join(Goal, PracticeSession.goal_id == Goal.id)
-        .where(Goal.user_id == user.id)
-        .where(PracticeSession.id ==id)
+        delete(PracticeSession)
+        .where(PracticeSession.id == id)
+        .where(owned_by(user.id))
+        .returning(PracticeSession.id)
     )
-    result = await db.execute(stmt)
-    deleted_session = result.scalar_one_or_none()
+    deleted_id = await db.scalar(stmt)
 
-    if not deleted_session:
+    if not deleted_id:
         raise HTTPException(status_code=404, detail="Practice Session not found.")
-    
-    await db.delete(deleted_session)
-    await db.commit()
\ No newline at end of file
+
+    await db.commit()
+    read_cache.bump(user.id)
\ No newline at end of file
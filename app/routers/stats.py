@@ -0,0 +1,191 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from ..db import PracticeDailyRollup, Goal, User
+from ..users import current_active_user
+from ..replicas import get_read_session
+from ..diagnostics import query_budget
+from ..schemas import GoalStats, PeriodStats, Streaks
+from ..cache import cached_response
+from ..serialization import to_json, json_response, row_dicts, goal_stats_adapter, period_stats_adapter, streaks_adapter
+from ..settings import HEATMAP_MAX_DAYS
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, literal_column, Date, Float, Integer
+from sqlalchemy.dialects.postgresql import array_agg, aggregate_order_by
+from datetime import date, timedelta
+from typing import Literal
+import uuid
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["stats"]
+)
+
+@router.get("/goals")
+@query_budget(2)
+async def get_goal_stats(
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user)
+) -> list[GoalStats]:
+    total_minutes = func.coalesce(func.sum(PracticeDailyRollup.total_minutes), 0)
+    session_count = func.coalesce(func.sum(PracticeDailyRollup.session_count), 0)
+
+    stmt = (
+        select(
+            Goal.id.label("goal_id"),
+            Goal.title,
+            total_minutes.label("total_minutes"),
+            session_count.label("session_count"),
+            func.coalesce(total_minutes.cast(Float) / func.nullif(session_count, 0), 0).label("average_minutes")
+        )
+        # Matching user_id too lets the join use the rollup's (user_id, goal_id, date) key.
+        .outerjoin(
+            PracticeDailyRollup,
+            (PracticeDailyRollup.user_id == Goal.user_id) & (PracticeDailyRollup.goal_id == Goal.id)
+        )
+        .where(Goal.user_id == user.id)
+        .group_by(Goal.id)
+        .order_by(Goal.id)
+    )
+    result = await db.execute(stmt)
+
+    return json_response(goal_stats_adapter, row_dicts(result))
+
+@router.get("/periods/{period}")
+@query_budget(2)
+async def get_period_stats(
+    period: Literal["day", "week", "month"],
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    goal_id: uuid.UUID | None = None,
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user)
+) -> list[PeriodStats]:
+    # period is limited to the Literal above, so it is safe to inline. A bound
+    # parameter would render differently in SELECT and GROUP BY.
+    bucket = func.date_trunc(literal_column(f"'{period}'"), PracticeDailyRollup.date).cast(Date)
+    total_minutes = func.sum(PracticeDailyRollup.total_minutes)
+    session_count = func.sum(PracticeDailyRollup.session_count)
+
+    stmt = (
+        select(
+            bucket.label("bucket"),
+            total_minutes.label("total_minutes"),
+            session_count.label("session_count"),
+            (total_minutes.cast(Float) / session_count).label("average_minutes")
+        )
+        .where(PracticeDailyRollup.user_id == user.id)
+        .group_by(bucket)
+        .order_by(bucket)
+    )
+    if date_from:
+        stmt = stmt.where(PracticeDailyRollup.date >= date_from)
+    if date_to:
+        stmt = stmt.where(PracticeDailyRollup.date <= date_to)
+    if goal_id:
+        stmt = stmt.where(PracticeDailyRollup.goal_id == goal_id)
+
+    result = await db.execute(stmt)
+
+    return json_response(period_stats_adapter, row_dicts(result))
+
+def streaks_stmt(user_id: uuid.UUID, today: date, date_from: date, date_to: date):
+    """
+    Streaks and heatmap in one statement, from the user's rollup rows rather than every session.
+
+    Gaps and islands: over consecutive practice days, date - row_number() is constant, so
+    grouping by it gives one row per streak. Streaks only need the distinct dates, which
+    come from the (user_id, date) index without touching the table. Only the heatmap range
+    is summed, and its days come back as parallel arrays.
+    """
+    practice_days = (
+        select(PracticeDailyRollup.date)
+        .where(PracticeDailyRollup.user_id == user_id)
+        .where(PracticeDailyRollup.date <= today)
+        .distinct()
+        .cte("practice_days")
+    )
+    islands = (
+        select(
+            practice_days.c.date,
+            (practice_days.c.date - func.row_number().over(order_by=practice_days.c.date).cast(Integer)).label("island")
+        )
+        .cte("islands")
+    )
+    streaks = (
+        select(
+            func.min(islands.c.date).label("start"),
+            func.max(islands.c.date).label("end"),
+            func.count().label("length")
+        )
+        .group_by(islands.c.island)
+        .cte("streaks")
+    )
+    days = (
+        select(
+            PracticeDailyRollup.date,
+            func.sum(PracticeDailyRollup.total_minutes).label("total_minutes"),
+            func.sum(PracticeDailyRollup.session_count).label("session_count")
+        )
+        .where(PracticeDailyRollup.user_id == user_id)
+        .where(PracticeDailyRollup.date.between(date_from, date_to))
+        .group_by(PracticeDailyRollup.date)
+        .cte("days")
+    )
+
+    def days_array(column):
+        return select(array_agg(aggregate_order_by(column, days.c.date))).scalar_subquery()
+
+    def longest(column):
+        return array_agg(aggregate_order_by(column, streaks.c.length.desc(), streaks.c.end.desc()))[1]
+
+    return (
+        select(
+            # Only the latest streak can reach yesterday. It still counts as current, since
+            # today's practice may not have happened yet.
+            func.coalesce(
+                func.max(streaks.c.length).filter(streaks.c.end >= today - timedelta(days=1)), 0
+            ).label("current_streak"),
+            func.coalesce(func.max(streaks.c.length), 0).label("longest_streak"),
+            longest(streaks.c.start).label("longest_streak_start"),
+            longest(streaks.c.end).label("longest_streak_end"),
+            days_array(days.c.date).label("dates"),
+            days_array(days.c.total_minutes).label("total_minutes"),
+            days_array(days.c.session_count).label("session_count")
+        )
+        .select_from(streaks)
+    )
+
+@router.get("/streaks")
+@query_budget(2)
+async def get_streaks(
+    request: Request,
+    date_from: date | None = Query(None, alias="from"),
+    date_to: date | None = Query(None, alias="to"),
+    today: date | None = Query(None, description="The client's local date. Defaults to the server's."),
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user)
+) -> Streaks:
+    today = today or date.today()
+    date_to = date_to or today
+    date_from = date_from or date_to - timedelta(days=HEATMAP_MAX_DAYS - 1)
+    if date_from > date_to or (date_to - date_from).days >= HEATMAP_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"from must be on or before to, and at most {HEATMAP_MAX_DAYS} days apart."
+        )
+
+    async def build() -> bytes:
+        result = await db.execute(streaks_stmt(user.id, today, date_from, date_to))
+        row = result.one()
+        days = [
+            {"date": d, "total_minutes": minutes, "session_count": count}
+            for d, minutes, count in zip(row.dates or [], row.total_minutes or [], row.session_count or [])
+        ]
+        return to_json(streaks_adapter, {
+            "current_streak": row.current_streak,
+            "longest_streak": row.longest_streak,
+            "longest_streak_start": row.longest_streak_start,
+            "longest_streak_end": row.longest_streak_end,
+            "days": days,
+        })
+
+    return await cached_response(request, user.id, build)
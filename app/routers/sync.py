@@ -0,0 +1,213 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from ..db import Goal, PracticeSession, SyncTombstone, User, GOAL_COLUMNS, SESSION_COLUMNS
+from ..users import current_active_user
+from ..replicas import get_read_session
+from ..diagnostics import query_budget
+from ..schemas import SyncChanges
+from ..cache import cached_response
+from ..pagination import encode_cursor, decode_cursor
+from ..serialization import to_json, json_response, sync_adapter
+from ..settings import SYNC_TOMBSTONE_RETENTION_DAYS, MAX_PAGE_SIZE
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, tuple_, true, BigInteger, Text
+from dataclasses import dataclass, replace
+from time import time
+import uuid
+
+router = APIRouter(tags=["sync"])
+
+# Oldest transaction still running when the snapshot was taken. Everything that committed
+# with a lower id is visible to every later statement in this request.
+WATERMARK = select(func.pg_snapshot_xmin(func.pg_current_snapshot()).cast(Text).cast(BigInteger))
+
+# A token is trusted for a day less than tombstones are kept, so a delete that committed
+# late can't have been pruned before the client asks for it.
+TOKEN_MAX_AGE = (SYNC_TOMBSTONE_RETENTION_DAYS - 1) * 86400
+
+# Read in this order, each by (change_txid, id). Tombstones come last, so a row deleted
+# while a sync is being paged through still ends up deleted on the client.
+STREAMS = ("goal", "practice_session", "tombstone")
+
+@dataclass
+class SyncPosition:
+    """How far a sync has got. Handed to clients, opaque, as the token."""
+    # Rows at or above this transaction id are sent. None for a full sync.
+    since: int | None
+    since_at: int
+    # Taken by the first page. Becomes `since` for the next sync once every page is read.
+    watermark: int | None = None
+    watermark_at: int = 0
+    stream: int = 0
+    after_txid: int | None = None
+    after_id: uuid.UUID | int | None = None
+
+    @property
+    def after(self) -> tuple | None:
+        return None if self.after_txid is None else (self.after_txid, self.after_id)
+
+def encode_sync_token(position: SyncPosition) -> str:
+    return encode_cursor(*("" if value is None else value for value in vars(position).values()))
+
+def decode_sync_token(token: str) -> SyncPosition | None:
+    """Where the token left off, or None when it is too old to sync from."""
+    since, since_at, watermark, watermark_at, stream, after_txid, after_id = decode_cursor(token, 7)
+    optional_int = lambda value: int(value) if value else None
+    try:
+        position = SyncPosition(
+            optional_int(since), int(since_at), optional_int(watermark), int(watermark_at),
+            int(stream), optional_int(after_txid)
+        )
+        if not 0 <= position.stream < len(STREAMS) or (position.after_txid is None) != (not after_id):
+            raise ValueError(token)
+        if after_id:
+            position.after_id = int(after_id) if STREAMS[position.stream] == "tombstone" else uuid.UUID(after_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid sync token.")
+
+    if position.since is not None and time() - position.since_at >= TOKEN_MAX_AGE:
+        return None
+    return position
+
+def changed_goals_stmt(user_id: uuid.UUID, since: int | None, after: tuple | None, limit: int):
+    stmt = (
+        select(*GOAL_COLUMNS, Goal.updated_at, Goal.change_txid, Goal.id.label("cursor_id"))
+        .where(Goal.user_id == user_id)
+        .order_by(Goal.change_txid, Goal.id)
+        .limit(limit)
+    )
+    if since is not None:
+        stmt = stmt.where(Goal.change_txid >= since)
+    if after:
+        stmt = stmt.where(tuple_(Goal.change_txid, Goal.id) > after)
+    return stmt
+
+def changed_sessions_stmt(user_id: uuid.UUID, since: int | None, after: tuple | None, limit: int):
+    """
+    Capped per goal with a LATERAL LIMIT, so each page reads at most `limit` rows from each
+    goal's (goal_id, change_txid, id) range. Without it, every page of a large import, all
+    written by one transaction, would read everything after the cursor again.
+    """
+    changed = (
+        select(*SESSION_COLUMNS, PracticeSession.updated_at, PracticeSession.change_txid)
+        .where(PracticeSession.goal_id == Goal.id)
+        .order_by(PracticeSession.change_txid, PracticeSession.id)
+        .limit(limit)
+    )
+    if since is not None:
+        changed = changed.where(PracticeSession.change_txid >= since)
+    if after:
+        changed = changed.where(tuple_(PracticeSession.change_txid, PracticeSession.id) > after)
+    changed = changed.lateral()
+
+    return (
+        select(changed, changed.c.id.label("cursor_id"))
+        .select_from(Goal)
+        .join(changed, true())
+        .where(Goal.user_id == user_id)
+        .order_by(changed.c.change_txid, changed.c.id)
+        .limit(limit)
+    )
+
+def tombstones_stmt(user_id: uuid.UUID, since: int, after: tuple | None, limit: int):
+    stmt = (
+        select(
+            SyncTombstone.entity,
+            SyncTombstone.entity_id.label("id"),
+            SyncTombstone.deleted_at,
+            SyncTombstone.change_txid,
+            SyncTombstone.id.label("cursor_id")
+        )
+        .where(SyncTombstone.user_id == user_id)
+        .where(SyncTombstone.change_txid >= since)
+        .order_by(SyncTombstone.change_txid, SyncTombstone.id)
+        .limit(limit)
+    )
+    if after:
+        stmt = stmt.where(tuple_(SyncTombstone.change_txid, SyncTombstone.id) > after)
+    return stmt
+
+STREAM_STMTS = {"goal": changed_goals_stmt, "practice_session": changed_sessions_stmt, "tombstone": tombstones_stmt}
+
+async def read_page(db: AsyncSession, user_id: uuid.UUID, position: SyncPosition, limit: int) -> dict:
+    """Up to `limit` rows, carrying on from `position` through the remaining streams."""
+    if position.watermark is None:
+        # Taken before any rows are read, so every row below it has committed by then.
+        # A lagging replica can report an older watermark than the token it was given.
+        # Everything below the token was already sent, so never go back past it.
+        position = replace(position, watermark=max(await db.scalar(WATERMARK), position.since or 0), watermark_at=int(time()))
+
+    # A full sync sends what exists now, so it has no deletes to report.
+    streams = STREAMS if position.since is not None else STREAMS[:2]
+    rows = {stream: [] for stream in STREAMS}
+    remaining = limit
+    next_position = None
+
+    for index in range(position.stream, len(streams)):
+        after = position.after if index == position.stream else None
+        if remaining == 0:
+            next_position = replace(position, stream=index, after_txid=None, after_id=None)
+            break
+
+        stream = streams[index]
+        result = (await db.execute(STREAM_STMTS[stream](user_id, position.since, after, remaining + 1))).all()
+        if len(result) > remaining:
+            result = result[:remaining]
+            next_position = replace(position, stream=index, after_txid=result[-1].change_txid, after_id=result[-1].cursor_id)
+        rows[stream] = [row._asdict() for row in result]
+        remaining -= len(result)
+        if next_position:
+            break
+
+    for row in (row for stream_rows in rows.values() for row in stream_rows):
+        del row["change_txid"], row["cursor_id"]
+
+    if next_position is None:
+        next_position = SyncPosition(since=position.watermark, since_at=position.watermark_at)
+        has_more = False
+    else:
+        has_more = True
+
+    deleted = {"goal": [], "practice_session": []}
+    for row in rows["tombstone"]:
+        deleted[row.pop("entity")].append(row)
+
+    return {
+        "token": encode_sync_token(next_position),
+        "has_more": has_more,
+        "full": position.since is None,
+        "goals": rows["goal"],
+        "practice_sessions": rows["practice_session"],
+        "deleted_goals": deleted["goal"],
+        "deleted_practice_sessions": deleted["practice_session"],
+    }
+
+@router.get("/sync")
+@query_budget(5)
+async def sync(
+    request: Request,
+    since: str | None = Query(None, description="The token from the previous page or sync. Omit for everything."),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_session),
+    user: User = Depends(current_active_user)
+) -> SyncChanges:
+    """
+    Goals and sessions changed since `since`, and the ids of those deleted, `limit` rows a page.
+
+    Rows carry the id of the transaction that last wrote them. A sync's first page takes the
+    lowest transaction id still in flight, and once every page has been read, the token
+    asks for rows at or above it next time. A row from a transaction that was in flight can
+    come back twice, but none is ever skipped.
+    """
+    position = decode_sync_token(since) if since else None
+    if position is None:
+        position = SyncPosition(since=None, since_at=int(time()))
+
+    if position.since is None:
+        # Full syncs are the user's whole history, page after page. Caching those would fill
+        # the read cache with bodies nobody asks for twice.
+        return json_response(sync_adapter, await read_page(db, user.id, position, limit))
+
+    async def build() -> bytes:
+        return to_json(sync_adapter, await read_page(db, user.id, position, limit))
+
+    return await cached_response(request, user.id, build)
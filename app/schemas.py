@@ -1,5 +1,5 @@
-from pydantic import BaseModel, UUID4
-from datetime import date, time
+from pydantic import BaseModel, UUID4, ValidationError
+from datetime import date, time, datetime
 # import uuid
 from fastapi_users import schemas
 
@@ -14,6 +14,10 @@ class SavedGoal(BaseModel):
     description : str
     complete : bool
 
+class GoalPage(BaseModel):
+    items: list[SavedGoal]
+    next_cursor: str | None = None
+
 class UpdateGoal(BaseModel):
     title: str | None = None
     description: str | None = None
@@ -35,12 +39,125 @@ class SavedPracticeSession(BaseModel):
     notes : str
     goal_id: UUID4
 
+class PracticeSessionPage(BaseModel):
+    items: list[SavedPracticeSession]
+    next_cursor: str | None = None
+
+class GoalTotals(BaseModel):
+    total_minutes: int
+    session_count: int
+
+class GoalDetail(SavedGoal):
+    # Only filled in when asked for with ?include=sessions,totals.
+    sessions: list[SavedPracticeSession] | None = None
+    totals: GoalTotals | None = None
+
+class GoalDetailPage(BaseModel):
+    items: list[GoalDetail]
+    next_cursor: str | None = None
+
+class ExportedPracticeSession(SavedPracticeSession):
+    goal_title: str | None
+
+class BulkPracticeSessionError(BaseModel):
+    index: int
+    detail: str
+
+class BulkPracticeSessionResult(BaseModel):
+    created: list[SavedPracticeSession]
+    errors: list[BulkPracticeSessionError]
+
+class PracticeSessionImportError(BaseModel):
+    line: int
+    detail: str
+
+class PracticeSessionImportResult(BaseModel):
+    imported: int
+    goals_created: int
+    rejected: int
+    errors: list[PracticeSessionImportError]
+
 class UpdatePracticeSession(BaseModel):
     # date : date | None = None
     notes : str | None = None
     start_time : time | None = None
     end_time : time | None = None
 
+class GoalSearchResult(SavedGoal):
+    rank: float
+
+class GoalSearchPage(BaseModel):
+    items: list[GoalSearchResult]
+    next_cursor: str | None = None
+
+class PracticeSessionSearchResult(SavedPracticeSession):
+    rank: float
+
+class PracticeSessionSearchPage(BaseModel):
+    items: list[PracticeSessionSearchResult]
+    next_cursor: str | None = None
+
+class GoalStats(BaseModel):
+    goal_id: UUID4
+    title: str | None
+    total_minutes: int
+    session_count: int
+    average_minutes: float
+
+class PeriodStats(BaseModel):
+    bucket: date
+    total_minutes: int
+    session_count: int
+    average_minutes: float
+
+class HeatmapDay(BaseModel):
+    date: date
+    total_minutes: int
+    session_count: int
+
+class Streaks(BaseModel):
+    current_streak: int
+    longest_streak: int
+    longest_streak_start: date | None
+    longest_streak_end: date | None
+    # Only days with practice, oldest first.
+    days: list[HeatmapDay]
+
+class SyncedGoal(SavedGoal):
+    updated_at: datetime
+
+class SyncedPracticeSession(SavedPracticeSession):
+    updated_at: datetime
+
+class Tombstone(BaseModel):
+    id: UUID4
+    deleted_at: datetime
+
+class SyncChanges(BaseModel):
+    # Pass back as ?since= next time.
+    token: str
+    # True when the token is for the next page of this sync rather than the next sync.
+    has_more: bool
+    # True when the lists are everything the user has, rather than changes, and the client
+    # should replace what it holds.
+    full: bool
+    goals: list[SyncedGoal]
+    practice_sessions: list[SyncedPracticeSession]
+    # A deleted goal's sessions are gone too, and aren't listed separately.
+    deleted_goals: list[Tombstone]
+    deleted_practice_sessions: list[Tombstone]
+
+class PoolStatus(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+
+class Readiness(BaseModel):
+    status: str
+    db_latency_ms: float | None
+    pool: PoolStatus
+
 class UserRead(schemas.BaseUser[UUID4]):
     pass
 
@@ -48,4 +165,10 @@ class UserCreate(schemas.BaseUserCreate):
     pass
 
 class UserUpdate(schemas.BaseUserUpdate):
-    pass
\ No newline at end of file
+    pass
+
+def validation_detail(e: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(l) for l in err['loc'])}: {err['msg']}" if err['loc'] else err['msg']
+        for err in e.errors()
+    )
@@ -0,0 +1,74 @@
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
+from app.schemas import (
+    SavedGoal, UpdateGoal, GoalTotals, SavedPracticeSession, BulkPracticeSessionError, GoalStats, PeriodStats,
+    HeatmapDay, Streaks, SyncChanges, SyncedGoal, SyncedPracticeSession, Tombstone,
+    GoalSearchResult, PracticeSessionSearchResult, ExportedPracticeSession
+)
+from collections.abc import Iterable
+from typing import Any
+
+class RawJSONResponse(Response):
+    """Response for a body that is already JSON bytes, so FastAPI doesn't validate or encode it again."""
+    media_type = "application/json"
+
+def row_type(model: type[BaseModel]) -> type:
+    """
+    TypedDict with the same fields as `model`.
+
+    Rows come back from Postgres already typed, so they can be dumped with this shape
+    without being validated into model instances first.
+    """
+    return TypedDict(f"{model.__name__}Row", {name: field.annotation for name, field in model.model_fields.items()})
+
+def page_type(row: type) -> type:
+    return TypedDict(f"{row.__name__}Page", {"items": list[row], "next_cursor": str | None})
+
+GoalRow = row_type(SavedGoal)
+UpdateGoalRow = row_type(UpdateGoal)
+SessionRow = row_type(SavedPracticeSession)
+GoalDetailRow = TypedDict("GoalDetailRow", {
+    **GoalRow.__annotations__,
+    "sessions": list[SessionRow] | None,
+    "totals": row_type(GoalTotals) | None,
+})
+
+# Building a TypeAdapter compiles its serializer, so build each one once.
+goal_adapter = TypeAdapter(GoalRow)
+goal_page_adapter = TypeAdapter(page_type(GoalRow))
+goal_detail_adapter = TypeAdapter(GoalDetailRow)
+goal_detail_page_adapter = TypeAdapter(page_type(GoalDetailRow))
+update_goal_adapter = TypeAdapter(UpdateGoalRow)
+session_adapter = TypeAdapter(SessionRow)
+session_list_adapter = TypeAdapter(list[SessionRow])
+session_page_adapter = TypeAdapter(page_type(SessionRow))
+export_row_adapter = TypeAdapter(row_type(ExportedPracticeSession))
+bulk_result_adapter = TypeAdapter(
+    TypedDict("BulkPracticeSessionResultRow", {"created": list[SessionRow], "errors": list[BulkPracticeSessionError]})
+)
+goal_search_page_adapter = TypeAdapter(page_type(row_type(GoalSearchResult)))
+session_search_page_adapter = TypeAdapter(page_type(row_type(PracticeSessionSearchResult)))
+goal_stats_adapter = TypeAdapter(list[row_type(GoalStats)])
+period_stats_adapter = TypeAdapter(list[row_type(PeriodStats)])
+streaks_adapter = TypeAdapter(
+    TypedDict("StreaksRow", {**row_type(Streaks).__annotations__, "days": list[row_type(HeatmapDay)]})
+)
+sync_adapter = TypeAdapter(
+    TypedDict("SyncChangesRow", {
+        **row_type(SyncChanges).__annotations__,
+        "goals": list[row_type(SyncedGoal)],
+        "practice_sessions": list[row_type(SyncedPracticeSession)],
+        "deleted_goals": list[row_type(Tombstone)],
+        "deleted_practice_sessions": list[row_type(Tombstone)],
+    })
+)
+
+def row_dicts(rows: Iterable[Any]) -> list[dict]:
+    return [row._asdict() for row in rows]
+
+def to_json(adapter: TypeAdapter, data: Any) -> bytes:
+    return adapter.dump_json(data)
+
+def json_response(adapter: TypeAdapter, data: Any, status_code: int = 200) -> RawJSONResponse:
+    return RawJSONResponse(content=adapter.dump_json(data), status_code=status_code)
@@ -0,0 +1,35 @@
+"""
+Production entry point: python -m app.serve
+
+Runs WEB_WORKERS uvicorn worker processes on HOST:PORT. uvicorn picks uvloop and httptools
+when they are installed and falls back to asyncio and h11 otherwise. On SIGTERM each worker
+stops accepting connections, gives in-flight requests up to GRACEFUL_TIMEOUT seconds and
+then runs the lifespan shutdown, which closes its connection pool.
+"""
+from app.settings import HOST, PORT, WEB_WORKERS, GRACEFUL_TIMEOUT, DB_POOL_SIZE, DB_MAX_OVERFLOW
+import importlib.util
+import uvicorn
+
+def available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+def main():
+    loop = "uvloop" if available("uvloop") else "asyncio"
+    http = "httptools" if available("httptools") else "h11"
+    print(
+        f"Serving on {HOST}:{PORT} with {WEB_WORKERS} workers ({loop}, {http}), "
+        f"up to {DB_POOL_SIZE + DB_MAX_OVERFLOW} DB connections each."
+    )
+    uvicorn.run(
+        "app.app:app",
+        host=HOST,
+        port=PORT,
+        workers=WEB_WORKERS,
+        loop=loop,
+        http=http,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        proxy_headers=True,
+    )
+
+if __name__ == '__main__':
+    main()
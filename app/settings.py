@@ -1,9 +1,13 @@
 from dotenv import load_dotenv
 from sqlalchemy import URL
+from pathlib import Path
 import os
 
 load_dotenv()
 
+def env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
 # url_object = URL.create(
 #     drivername = os.getenv("db_drivername"),
 #     username = os.getenv("db_username"),
@@ -14,4 +18,93 @@ load_dotenv()
 # )
 
 DATABASE_URL = os.getenv("DATABASE_URL")
-SECRET_KEY = os.getenv("SECRET_KEY")
\ No newline at end of file
+SECRET_KEY = os.getenv("SECRET_KEY")
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+GOAL_EMBEDDED_SESSIONS = int(os.getenv("GOAL_EMBEDDED_SESSIONS", "20"))
+HEATMAP_MAX_DAYS = int(os.getenv("HEATMAP_MAX_DAYS", "366"))
+# How long /sync keeps deletes. Clients that haven't synced for longer get a full resync.
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "1000"))
+EXPORT_FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+# Connection pool. DB_POOL_PROFILE=pgbouncer turns off prepared statement caching so the
+# app can sit behind PgBouncer in transaction pooling mode.
+DB_POOL_PROFILE = os.getenv("DB_POOL_PROFILE", "default")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+
+# Production server, see app/serve.py.
+HOST = os.getenv("HOST", "localhost")
+PORT = int(os.getenv("PORT", "8000"))
+# One by default: the read and user caches below live in each worker and aren't kept in
+# step between them.
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+
+# Serialized GET responses (see app/cache.py) and authenticated users. Each worker keeps its
+# own, and a write only invalidates the worker that served it, so both are off by default
+# with more than one.
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", "10000"))
+READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", "30" if WEB_WORKERS == 1 else "0"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60" if WEB_WORKERS == 1 else "0"))
+
+# Total connections all workers may hold. When set, each worker gets an equal share as a
+# fixed-size pool, overriding DB_POOL_SIZE and DB_MAX_OVERFLOW.
+DB_CONNECTION_BUDGET = int(os.getenv("DB_CONNECTION_BUDGET", "0"))
+if WEB_WORKERS < 1:
+    raise ValueError("WEB_WORKERS must be at least 1.")
+if DB_CONNECTION_BUDGET > 0:
+    if DB_CONNECTION_BUDGET < WEB_WORKERS:
+        raise ValueError(
+            f"DB_CONNECTION_BUDGET ({DB_CONNECTION_BUDGET}) is less than WEB_WORKERS ({WEB_WORKERS}). "
+            "Every worker needs at least one connection."
+        )
+    DB_POOL_SIZE = DB_CONNECTION_BUDGET // WEB_WORKERS
+    DB_MAX_OVERFLOW = 0
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "2"))
+
+# Read replicas for GET handlers, comma separated. Empty sends everything to DATABASE_URL.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_RETRY_INTERVAL = float(os.getenv("REPLICA_RETRY_INTERVAL", "30"))
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", "10"))
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+
+# What the lifespan does about the schema: "create_all" (create missing tables), "check"
+# (fail unless alembic_version is at the head revision) or "skip".
+STARTUP_SCHEMA_MODE = os.getenv("STARTUP_SCHEMA_MODE", "create_all")
+ALEMBIC_CONFIG = os.getenv("ALEMBIC_CONFIG", str(Path(__file__).resolve().parent.parent / "alembic.ini"))
+DB_WARMUP_CONNECTIONS = int(os.getenv("DB_WARMUP_CONNECTIONS", "0"))
+
+# Query diagnostics, off by default. See app/diagnostics.py.
+DIAGNOSTICS_ENABLED = env_bool("DIAGNOSTICS_ENABLED", False)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "3"))
+DEFAULT_QUERY_BUDGET = int(os.getenv("DEFAULT_QUERY_BUDGET", "10"))
+QUERY_BUDGET_STRICT = env_bool("QUERY_BUDGET_STRICT", False)
+
+# Per-user token buckets, see app/ratelimit.py.
+RATE_LIMIT_ENABLED = env_bool("RATE_LIMIT_ENABLED", True)
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "10"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "60"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "")
+if RATE_LIMIT_PER_SECOND <= 0 or RATE_LIMIT_BURST <= 0:
+    raise ValueError(
+        "RATE_LIMIT_PER_SECOND and RATE_LIMIT_BURST must be greater than 0. "
+        "Set RATE_LIMIT_ENABLED=false to turn rate limiting off."
+    )
+
+# Load shedding, see app/loadshed.py. 0 turns either check off.
+LOAD_SHED_MAX_IN_FLIGHT = int(os.getenv("LOAD_SHED_MAX_IN_FLIGHT", "0"))
+LOAD_SHED_POOL_WAIT_MS = float(os.getenv("LOAD_SHED_POOL_WAIT_MS", "500"))
+LOAD_SHED_WINDOW_MS = float(os.getenv("LOAD_SHED_WINDOW_MS", "1000"))
+LOAD_SHED_EXEMPT_PATHS = ("/health", "/metrics")
@@ -0,0 +1,79 @@
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+from app.db import engine, User, create_db_and_tables
+from app.routers.goals import goals_stmt, goal_stmt
+from app.routers.sessions import sessions_stmt, session_stmt, owned_goal_stmt
+from app.settings import ALEMBIC_CONFIG, STARTUP_SCHEMA_MODE, DB_WARMUP_CONNECTIONS, DB_POOL_SIZE
+from contextlib import AsyncExitStack
+from datetime import date
+from time import perf_counter
+import asyncio
+import uuid
+
+class SchemaMismatch(RuntimeError):
+    pass
+
+def expected_revisions() -> set[str]:
+    return set(ScriptDirectory.from_config(Config(ALEMBIC_CONFIG)).get_heads())
+
+async def check_schema_revision() -> None:
+    """Fail unless the database is at the Alembic head(s) this code ships with."""
+    expected = expected_revisions()
+    try:
+        async with engine.connect() as conn:
+            current = set((await conn.scalars(text("SELECT version_num FROM alembic_version"))).all())
+    except DBAPIError as e:
+        raise SchemaMismatch(f"Could not read alembic_version: {e.orig}. Run `alembic upgrade head`.") from e
+
+    if current != expected:
+        raise SchemaMismatch(
+            f"Database is at revision {', '.join(sorted(current)) or 'none'}, "
+            f"this code expects {', '.join(sorted(expected))}. Run `alembic upgrade head`."
+        )
+
+def hot_statements() -> list:
+    # Same shapes the request handlers build, so they share compiled-cache entries and
+    # each warmed connection has them prepared already. The ids match nothing.
+    user_id, row_id = uuid.uuid4(), uuid.uuid4()
+    return [
+        select(User).where(User.id == user_id),
+        goals_stmt(user_id, 1),
+        goals_stmt(user_id, 1, row_id),
+        goal_stmt(user_id, row_id),
+        sessions_stmt(user_id, 1),
+        sessions_stmt(user_id, 1, (date.today(), row_id)),
+        sessions_stmt(user_id, 1, goal_id=row_id),
+        session_stmt(user_id, row_id),
+        owned_goal_stmt(user_id, row_id),
+    ]
+
+async def warm_pool(connections: int) -> None:
+    statements = hot_statements()
+    # Check every connection out at once, or the pool would hand the same one back each time.
+    async with AsyncExitStack() as stack:
+        conns = await asyncio.gather(*(stack.enter_async_context(engine.connect()) for _ in range(connections)))
+        for conn in conns:
+            for stmt in statements:
+                await conn.execute(stmt)
+
+async def startup(imported_in: float) -> None:
+    start = perf_counter()
+    timings = [f"imports {imported_in * 1000:.0f} ms"]
+
+    if STARTUP_SCHEMA_MODE == "create_all":
+        await create_db_and_tables()
+    elif STARTUP_SCHEMA_MODE == "check":
+        await check_schema_revision()
+    if STARTUP_SCHEMA_MODE != "skip":
+        timings.append(f"schema {STARTUP_SCHEMA_MODE} {(perf_counter() - start) * 1000:.0f} ms")
+
+    connections = min(DB_WARMUP_CONNECTIONS, DB_POOL_SIZE)
+    if connections > 0:
+        warm_start = perf_counter()
+        await warm_pool(connections)
+        timings.append(f"warmed {connections} connections {(perf_counter() - warm_start) * 1000:.0f} ms")
+
+    timings.append(f"total startup {(perf_counter() - start) * 1000:.0f} ms")
+    print(f"Startup: {', '.join(timings)}.")
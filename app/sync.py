@@ -0,0 +1,32 @@
+from sqlalchemy import select, delete, func
+from app.db import SyncTombstone, async_session_maker
+from app.settings import SYNC_TOMBSTONE_RETENTION_DAYS
+from datetime import timedelta
+import argparse
+import asyncio
+
+async def prune_tombstones(retention_days: int = SYNC_TOMBSTONE_RETENTION_DAYS, batch_size: int = 10000) -> int:
+    """Delete sync tombstones older than retention_days, batch_size rows per transaction."""
+    pruned = 0
+    cutoff = func.now() - timedelta(days=retention_days)
+
+    async with async_session_maker() as db:
+        while True:
+            batch = select(SyncTombstone.id).where(SyncTombstone.deleted_at < cutoff).limit(batch_size)
+            result = await db.execute(delete(SyncTombstone).where(SyncTombstone.id.in_(batch)))
+            await db.commit()
+
+            if not result.rowcount:
+                break
+            pruned += result.rowcount
+            print(f"Pruned {pruned} sync tombstones.")
+
+    return pruned
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Delete sync tombstones past their retention.")
+    parser.add_argument("--retention-days", type=int, default=SYNC_TOMBSTONE_RETENTION_DAYS, help="Days of deletes to keep.")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Tombstones per transaction.")
+    args = parser.parse_args()
+
+    asyncio.run(prune_tombstones(args.retention_days, args.batch_size))
@@ -0,0 +1,354 @@
+"""
+Load test for the goals and practice_session endpoints.
+
+    DATABASE_URL=postgresql+asyncpg://... python -m bench.load_test \\
+        --users 20 --goals 10 --sessions 50 --requests 500 --concurrency 16 --output bench.json
+
+The app runs in-process behind httpx's ASGI transport, against whatever database
+DATABASE_URL points at (migrated to head). With --base-url it drives a running server
+instead, which must use the same database; queries per request are only known in-process. Each run seeds its own users, logs them in
+through /auth/jwt/login, drives every endpoint in turn and deletes the users again.
+
+Results go to stdout and, with --output, to a JSON file meant to be diffed between commits.
+Queries per request come from SQLAlchemy cursor events on the app's engine.
+"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "bench-secret-key-bench-secret-key")
+# A few users send every request, so the per-user limit would be what gets measured.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from app.app import app
+from app.cache import read_cache
+from app.db import engine, async_session_maker, User, Goal, PracticeSession
+from sqlalchemy import event, insert, delete
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import date, time, timedelta, datetime, timezone
+from time import perf_counter
+import argparse
+import asyncio
+import httpx
+import json
+import platform
+import random
+import subprocess
+import sys
+import uuid
+
+PASSWORD = "bench-password"
+
+query_count: ContextVar[list[int] | None] = ContextVar("query_count", default=None)
+
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = query_count.get()
+    if counter is not None:
+        counter[0] += 1
+
+@dataclass
+class BenchUser:
+    email: str
+    headers: dict[str, str] = field(default_factory=dict)
+    goal_ids: list[uuid.UUID] = field(default_factory=list)
+    session_ids: list[uuid.UUID] = field(default_factory=list)
+
+@dataclass
+class Result:
+    latencies: list[float] = field(default_factory=list)
+    queries: list[int] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+def session_values(rng: random.Random) -> dict:
+    start = rng.randrange(0, 23 * 60, 5)
+    end = start + 45
+    return {
+        "date": date(2024, 1, 1) + timedelta(days=rng.randrange(365)),
+        "start_time": time(start // 60, start % 60),
+        "end_time": time(end // 60 % 24, end % 60),
+        "notes": "Scales and arpeggios",
+    }
+
+def session_payload(rng: random.Random, goal_id: uuid.UUID) -> dict:
+    payload = {key: value.isoformat() if key != "notes" else value for key, value in session_values(rng).items()}
+    return {**payload, "goal_id": str(goal_id)}
+
+async def seed(client: httpx.AsyncClient, args, rng: random.Random) -> list[BenchUser]:
+    run = uuid.uuid4().hex[:8]
+    users = [BenchUser(email=f"bench-{run}-{i}@example.com") for i in range(args.users)]
+
+    for user in users:
+        r = await client.post("/auth/register", json={"email": user.email, "password": PASSWORD})
+        r.raise_for_status()
+        r = await client.post("/auth/jwt/login", data={"username": user.email, "password": PASSWORD})
+        r.raise_for_status()
+        user.headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    # Goals and sessions go straight into the tables; only the timed requests go through the API.
+    async with async_session_maker() as session:
+        for user in users:
+            r = await client.get("/users/me", headers=user.headers)
+            user_id = uuid.UUID(r.json()["id"])
+            user.goal_ids = [uuid.uuid4() for _ in range(args.goals)]
+            await session.execute(insert(Goal), [
+                {"id": goal_id, "user_id": user_id, "title": f"Goal {i}", "description": "Seeded"}
+                for i, goal_id in enumerate(user.goal_ids)
+            ])
+
+            sessions = [
+                {"id": uuid.uuid4(), "goal_id": goal_id, **session_values(rng)}
+                for goal_id in user.goal_ids
+                for _ in range(args.sessions)
+            ]
+            await session.execute(insert(PracticeSession), sessions)
+            user.session_ids = [row["id"] for row in sessions]
+        await session.commit()
+
+    return users
+
+async def cleanup(users: list[BenchUser]):
+    async with async_session_maker() as session:
+        await session.execute(delete(User).where(User.email.in_([u.email for u in users])))
+        await session.commit()
+
+Request = tuple[str, str, dict]
+Scenario = Callable[[httpx.AsyncClient, BenchUser, random.Random], Awaitable[Request]]
+
+async def new_goal(client: httpx.AsyncClient, user: BenchUser) -> str:
+    r = await client.post("/goals/new", json={"title": "Scratch", "description": "Scratch"}, headers=user.headers)
+    return r.json()["id"]
+
+async def new_session(client: httpx.AsyncClient, user: BenchUser, rng: random.Random) -> str:
+    payload = session_payload(rng, rng.choice(user.goal_ids))
+    r = await client.post("/practice_session/new", json=payload, headers=user.headers)
+    return r.json()["id"]
+
+# Each scenario returns the request to time. Setup it needs (something to delete, say)
+# happens before it returns, so it isn't timed or counted.
+async def list_goals(client, user, rng):
+    return "GET", "/goals/", {}
+
+async def get_goal(client, user, rng):
+    return "GET", f"/goals/{rng.choice(user.goal_ids)}", {}
+
+async def list_goals_detailed(client, user, rng):
+    return "GET", "/goals/?include=sessions,totals", {}
+
+async def get_goal_detailed(client, user, rng):
+    return "GET", f"/goals/{rng.choice(user.goal_ids)}?include=sessions,totals", {}
+
+async def list_goal_sessions(client, user, rng):
+    return "GET", f"/goals/{rng.choice(user.goal_ids)}/sessions", {}
+
+async def create_goal(client, user, rng):
+    return "POST", "/goals/new", {"json": {"title": "Load test", "description": "Created by bench"}}
+
+async def complete_goal(client, user, rng):
+    return "PATCH", f"/goals/complete/{rng.choice(user.goal_ids)}", {"json": {"complete": rng.random() < 0.5}}
+
+async def update_goal(client, user, rng):
+    body = {"title": "Updated", "description": "Updated by bench", "complete": False}
+    return "PUT", f"/goals/update/{rng.choice(user.goal_ids)}", {"json": body}
+
+async def delete_goal(client, user, rng):
+    return "DELETE", f"/goals/delete/{await new_goal(client, user)}", {}
+
+async def list_sessions(client, user, rng):
+    return "GET", "/practice_session/", {}
+
+async def get_session(client, user, rng):
+    return "GET", f"/practice_session/{rng.choice(user.session_ids)}", {}
+
+async def export_sessions(client, user, rng):
+    return "GET", "/practice_session/export", {}
+
+async def create_session(client, user, rng):
+    return "POST", "/practice_session/new", {"json": session_payload(rng, rng.choice(user.goal_ids))}
+
+async def bulk_sessions(client, user, rng):
+    rows = [session_payload(rng, rng.choice(user.goal_ids)) for _ in range(50)]
+    return "POST", "/practice_session/bulk", {"json": rows}
+
+async def import_sessions(client, user, rng):
+    lines = ["date,start_time,end_time,notes,goal_id"]
+    for _ in range(50):
+        row = session_payload(rng, rng.choice(user.goal_ids))
+        lines.append(f"{row['date']},{row['start_time']},{row['end_time']},{row['notes']},{row['goal_id']}")
+    body = "\n".join(lines).encode()
+    return "POST", "/practice_session/import", {"files": {"file": ("sessions.csv", body, "text/csv")}}
+
+async def replace_session(client, user, rng):
+    body = {"notes": "Replaced by bench", "start_time": "09:00:00", "end_time": "10:15:00"}
+    return "PUT", f"/practice_session/update/{rng.choice(user.session_ids)}", {"json": body}
+
+async def patch_session(client, user, rng):
+    return "PATCH", f"/practice_session/update/{rng.choice(user.session_ids)}", {"json": {"notes": "Patched"}}
+
+async def delete_session(client, user, rng):
+    return "DELETE", f"/practice_session/delete/{await new_session(client, user, rng)}", {}
+
+SCENARIOS: dict[str, Scenario] = {
+    "GET /goals/": list_goals,
+    "GET /goals/?include=sessions,totals": list_goals_detailed,
+    "GET /goals/{id}": get_goal,
+    "GET /goals/{id}?include=sessions,totals": get_goal_detailed,
+    "GET /goals/{id}/sessions": list_goal_sessions,
+    "POST /goals/new": create_goal,
+    "PATCH /goals/complete/{id}": complete_goal,
+    "PUT /goals/update/{id}": update_goal,
+    "DELETE /goals/delete/{id}": delete_goal,
+    "GET /practice_session/": list_sessions,
+    "GET /practice_session/{id}": get_session,
+    "GET /practice_session/export": export_sessions,
+    "POST /practice_session/new": create_session,
+    "POST /practice_session/bulk": bulk_sessions,
+    "POST /practice_session/import": import_sessions,
+    "PUT /practice_session/update/{id}": replace_session,
+    "PATCH /practice_session/update/{id}": patch_session,
+    "DELETE /practice_session/delete/{id}": delete_session,
+}
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    users: list[BenchUser],
+    requests: int,
+    concurrency: int,
+    seed: int,
+    count_queries: bool
+) -> Result:
+    result = Result()
+    remaining = iter(range(requests))
+
+    async def worker(worker_id: int):
+        rng = random.Random(seed * 1000 + worker_id)
+        for i in remaining:
+            user = users[i % len(users)]
+            method, url, kwargs = await scenario(client, user, rng)
+
+            counter = [0]
+            token = query_count.set(counter)
+            start = perf_counter()
+            try:
+                r = await client.request(method, url, headers=user.headers, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                query_count.reset(token)
+
+            result.latencies.append(elapsed)
+            if count_queries:
+                result.queries.append(counter[0])
+            if r.status_code >= 400:
+                result.errors += 1
+
+    start = perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    result.elapsed = perf_counter() - start
+    return result
+
+def percentile(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def summarize(result: Result) -> dict:
+    count = len(result.latencies)
+    return {
+        "requests": count,
+        "errors": result.errors,
+        "throughput_rps": round(count / result.elapsed, 1),
+        "p50_ms": round(percentile(result.latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(result.latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(result.latencies, 99) * 1000, 2),
+        "queries_per_request": round(sum(result.queries) / count, 2) if result.queries else None,
+    }
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_summary(name: str, summary: dict) -> None:
+    queries = summary["queries_per_request"]
+    print(
+        f"{name:40} {summary['throughput_rps']:9.1f} req/s"
+        f"  p50 {summary['p50_ms']:8.2f}  p95 {summary['p95_ms']:8.2f}  p99 {summary['p99_ms']:8.2f} ms"
+        f"  {'  n/a' if queries is None else f'{queries:5.2f}'} q/req  {summary['errors']} errors"
+    )
+
+async def run(client: httpx.AsyncClient, args, selected: list[str]) -> dict:
+    users = await seed(client, args, random.Random(args.seed))
+    try:
+        results = {}
+        for name in selected:
+            results[name] = summarize(await run_scenario(
+                client, SCENARIOS[name], users, args.requests, args.concurrency, args.seed, not args.base_url
+            ))
+            print_summary(name, results[name])
+        return results
+    finally:
+        await cleanup(users)
+
+async def main(args):
+    if args.users < 1 or args.goals < 1 or args.sessions < 1:
+        sys.exit("--users, --goals and --sessions must all be at least 1.")
+
+    selected = args.only or list(SCENARIOS)
+
+    if args.base_url:
+        # A running server, possibly several worker processes. Their queries aren't visible from here.
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+            results = await run(client, args, selected)
+    else:
+        if args.no_read_cache:
+            read_cache.entries.maxsize = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", count_query)
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                results = await run(client, args, selected)
+    await engine.dispose()
+
+    if args.output:
+        report = {
+            "revision": git_revision(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "config": {
+                "users": args.users,
+                "goals_per_user": args.goals,
+                "sessions_per_goal": args.sessions,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "seed": args.seed,
+                "base_url": args.base_url,
+                "read_cache": not args.no_read_cache,
+            },
+            "endpoints": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test the goals and practice_session endpoints.")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--goals", type=int, default=5, help="Goals seeded per user.")
+    parser.add_argument("--sessions", type=int, default=20, help="Sessions seeded per goal.")
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per endpoint.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", help="Load test a running server instead of an in-process app.")
+    parser.add_argument("--no-read-cache", action="store_true", help="In-process only: build every GET response from the database.")
+    parser.add_argument("--only", action="append", choices=list(SCENARIOS), help="Run just this endpoint. Repeatable.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
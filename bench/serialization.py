@@ -0,0 +1,110 @@
+"""
+Microbenchmark: the old response path (model_validate per row, then FastAPI validates and
+encodes the returned models again) against the app.serialization path (row dicts dumped
+straight to JSON bytes by a cached TypeAdapter, sent as a RawJSONResponse).
+
+    python -m bench.serialization --rows 10000 --repeat 20
+
+Both endpoints are driven in-process through the ASGI interface, so the numbers include
+FastAPI's own response handling but no network and no database.
+"""
+import os
+
+# app.db builds the engine at import time. It never connects here.
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://bench@localhost/bench")
+
+from fastapi import FastAPI
+from app.db import PracticeSession, SESSION_COLUMNS
+from app.schemas import SavedPracticeSession
+from app.serialization import json_response, row_dicts, session_list_adapter
+from collections import namedtuple
+from datetime import date, time, timedelta
+from statistics import median
+from time import perf_counter
+import argparse
+import asyncio
+import uuid
+
+def make_data(rows: int):
+    goal_id = uuid.uuid4()
+    values = [
+        dict(
+            id=uuid.uuid4(),
+            date=date(2024, 1, 1) + timedelta(days=i % 365),
+            start_time=time(9, 0),
+            end_time=time(10, 30),
+            duration=90,
+            notes=f"Scales and arpeggios, take {i}",
+            goal_id=goal_id,
+        )
+        for i in range(rows)
+    ]
+    # ORM objects stand in for what the old handlers loaded, namedtuples for Row objects.
+    objects = [PracticeSession(**v) for v in values]
+    SessionRow = namedtuple("SessionRow", [c.key for c in SESSION_COLUMNS])
+    row_tuples = [SessionRow(**v) for v in values]
+    return objects, row_tuples
+
+def build_app(objects, row_tuples) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/baseline")
+    async def baseline() -> list[SavedPracticeSession]:
+        return [SavedPracticeSession.model_validate(o, from_attributes=True) for o in objects]
+
+    @app.get("/fast")
+    async def fast() -> list[SavedPracticeSession]:
+        return json_response(session_list_adapter, row_dicts(row_tuples))
+
+    return app
+
+async def call(app: FastAPI, path: str) -> bytes:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": [], "client": ("bench", 0), "server": ("bench", 80),
+    }
+    body = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            body.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(body)
+
+async def measure(app: FastAPI, path: str, repeat: int) -> list[float]:
+    await call(app, path)
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        await call(app, path)
+        timings.append(perf_counter() - start)
+    return timings
+
+async def main(rows: int, repeat: int):
+    objects, row_tuples = make_data(rows)
+    app = build_app(objects, row_tuples)
+
+    baseline_body = await call(app, "/baseline")
+    fast_body = await call(app, "/fast")
+    assert session_list_adapter.validate_json(baseline_body) == session_list_adapter.validate_json(fast_body)
+
+    baseline = median(await measure(app, "/baseline", repeat))
+    fast = median(await measure(app, "/fast", repeat))
+
+    print(f"rows={rows} repeat={repeat}")
+    print(f"baseline  {baseline * 1000:9.2f} ms  ({rows / baseline:,.0f} rows/s)")
+    print(f"fast      {fast * 1000:9.2f} ms  ({rows / fast:,.0f} rows/s)")
+    print(f"speedup   {baseline / fast:9.2f}x")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare response serialization paths.")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.repeat))
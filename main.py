@@ -1,4 +1,6 @@
 import uvicorn
+from app.settings import HOST, PORT
 
+# Development server with auto-reload. For production use `python -m app.serve`.
 if __name__ == '__main__':
-    uvicorn.run("app.app:app", host="localhost", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("app.app:app", host=HOST, port=PORT, reload=True)
@@ -0,0 +1,112 @@
+"""
+The tests run against a real Postgres: set DATABASE_URL to a scratch database. Tables
+are created on first use, and each test registers its own user. Without DATABASE_URL,
+tests marked `postgres` are skipped.
+"""
+import os
+
+os.environ.setdefault("SECRET_KEY", "test-secret-key-with-at-least-32-bytes")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import pytest
+import uuid
+
+def pytest_collection_modifyitems(config, items):
+    if os.getenv("DATABASE_URL"):
+        return
+    skip = pytest.mark.skip(reason="DATABASE_URL is not set.")
+    for item in items:
+        if "postgres" in item.keywords:
+            item.add_marker(skip)
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+@pytest.fixture
+async def app():
+    from app.app import app
+    from app.db import engine, create_db_and_tables
+
+    await create_db_and_tables()
+    yield app
+    # Each test runs on its own event loop, and pooled connections belong to the loop
+    # that opened them.
+    await engine.dispose()
+
+@pytest.fixture
+async def client(app) -> AsyncIterator:
+    import httpx
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
+
+@pytest.fixture
+async def auth(client) -> dict[str, str]:
+    """Headers for a freshly registered user, already in the user cache."""
+    email = f"{uuid.uuid4().hex}@example.com"
+    response = await client.post("/auth/register", json={"email": email, "password": "password123"})
+    assert response.status_code == 201, response.text
+    response = await client.post("/auth/jwt/login", data={"username": email, "password": "password123"})
+    assert response.status_code == 200, response.text
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert (await client.get("/users/me", headers=headers)).status_code == 200
+    return headers
+
+@dataclass
+class StatementLog:
+    statements: list[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+@pytest.fixture
+def count_statements(app):
+    """Context manager that records every statement the engine runs inside it."""
+    from sqlalchemy import event
+    from app.db import engine
+
+    @contextmanager
+    def counting() -> Iterator[StatementLog]:
+        log = StatementLog()
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            log.statements.append(statement)
+
+        event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield log
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    return counting
+
+@pytest.fixture
+async def budgeted_client(app) -> AsyncIterator:
+    """
+    Client whose requests fail with QueryBudgetExceeded when they run more queries than
+    their route's @query_budget, whatever DIAGNOSTICS_ENABLED says.
+    """
+    import httpx
+    from sqlalchemy import event
+    from app.db import engine
+    from app.diagnostics import DiagnosticsMiddleware, enforce_query_budgets, instrument_engine
+    from app.diagnostics import before_cursor_execute, after_cursor_execute
+
+    installed = not event.contains(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    if installed:
+        instrument_engine(engine)
+
+    transport = httpx.ASGITransport(app=DiagnosticsMiddleware(app))
+    try:
+        with enforce_query_budgets():
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+                yield c
+    finally:
+        if installed:
+            event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+            event.remove(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
@@ -0,0 +1,47 @@
+import pytest
+import uuid
+
+pytestmark = [pytest.mark.anyio, pytest.mark.postgres]
+
+def session(goal_id, **fields) -> dict:
+    return {"date": "2024-01-01", "start_time": "10:00", "end_time": "10:30", "notes": "n", "goal_id": goal_id, **fields}
+
+async def make_goal(client, headers) -> str:
+    response = await client.post("/goals/new", json={"title": "Scales", "description": "d"}, headers=headers)
+    assert response.status_code == 201
+    return response.json()["id"]
+
+async def test_bulk_reports_rejected_rows_and_saves_the_rest(client, auth):
+    goal = await make_goal(client, auth)
+    email = f"{uuid.uuid4().hex}@example.com"
+    await client.post("/auth/register", json={"email": email, "password": "password123"})
+    token = (await client.post("/auth/jwt/login", data={"username": email, "password": "password123"})).json()["access_token"]
+    someone_elses_goal = await make_goal(client, {"Authorization": f"Bearer {token}"})
+
+    response = await client.post("/practice_session/bulk", json=[
+        session(goal, notes="first"),
+        session(goal, start_time="not a time"),
+        session(someone_elses_goal),
+        session(goal, notes="last"),
+        "not an object",
+    ], headers=auth)
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert [s["notes"] for s in body["created"]] == ["first", "last"]
+    assert [e["index"] for e in body["errors"]] == [1, 2, 4]
+    assert body["errors"][1]["detail"] == "Goal not found."
+
+    saved = (await client.get(f"/practice_session/?goal_id={goal}", headers=auth)).json()["items"]
+    assert sorted(s["notes"] for s in saved) == ["first", "last"]
+
+async def test_bulk_with_every_row_rejected_is_422(client, auth):
+    goal = await make_goal(client, auth)
+
+    response = await client.post("/practice_session/bulk", json=[session(goal, date="never"), session(str(uuid.uuid4()))], headers=auth)
+    assert response.status_code == 422
+    assert [e["index"] for e in response.json()["errors"]] == [0, 1]
+    assert (await client.get(f"/practice_session/?goal_id={goal}", headers=auth)).json()["items"] == []
+
+async def test_empty_bulk_is_422(client, auth):
+    response = await client.post("/practice_session/bulk", json=[], headers=auth)
+    assert response.status_code == 422
@@ -0,0 +1,88 @@
+"""
+EXPLAIN the goal and session listing statements for every filter combination, on enough
+data that a sequential scan would be the wrong plan, and fail if Postgres picks one.
+
+The first run seeds 500 users with 400k sessions between them, which takes a while, and
+leaves them in the database for later runs.
+"""
+from datetime import date
+import itertools
+import json
+import pytest
+import uuid
+
+pytestmark = [pytest.mark.anyio, pytest.mark.postgres]
+
+SEED_EMAIL = "explain-seed-0@example.com"
+SEED_USERS = 500
+GOALS_PER_USER = 40
+SESSIONS_PER_GOAL = 20
+
+SEED_SQL = [
+    f"""
+    INSERT INTO "user" (id, email, hashed_password, is_active, is_superuser, is_verified)
+    SELECT gen_random_uuid(), 'explain-seed-' || i || '@example.com', 'x', true, false, false
+    FROM generate_series(0, {SEED_USERS - 1}) AS i
+    """,
+    f"""
+    INSERT INTO goal (id, user_id, title, description, complete)
+    SELECT gen_random_uuid(), u.id, 'Goal ' || i, 'Seeded', i % 4 = 0
+    FROM "user" AS u, generate_series(1, {GOALS_PER_USER}) AS i
+    WHERE u.email LIKE 'explain-seed-%'
+    """,
+    f"""
+    INSERT INTO practice_session (id, date, start_time, end_time, notes, goal_id)
+    SELECT gen_random_uuid(), DATE '2024-01-01' + (i * 7 + length(g.title)) % 366, '10:00', '10:30', 'Seeded', g.id
+    FROM goal AS g
+    JOIN "user" AS u ON u.id = g.user_id, generate_series(1, {SESSIONS_PER_GOAL}) AS i
+    WHERE u.email LIKE 'explain-seed-%'
+    """,
+    "ANALYZE",
+]
+
+async def seeded_user(conn) -> tuple[uuid.UUID, uuid.UUID]:
+    """The first seed user and one of their goals. Seeds on the first run only."""
+    from sqlalchemy import text
+
+    user_id = await conn.scalar(text('SELECT id FROM "user" WHERE email = :email'), {"email": SEED_EMAIL})
+    if user_id is None:
+        for statement in SEED_SQL:
+            await conn.execute(text(statement))
+        user_id = await conn.scalar(text('SELECT id FROM "user" WHERE email = :email'), {"email": SEED_EMAIL})
+    goal_id = await conn.scalar(text("SELECT id FROM goal WHERE user_id = :user_id LIMIT 1"), {"user_id": user_id})
+    return user_id, goal_id
+
+def scans(plan: dict):
+    yield plan["Node Type"], plan.get("Relation Name")
+    for child in plan.get("Plans", []):
+        yield from scans(child)
+
+async def seq_scans(conn, stmt) -> list[str]:
+    # Planned with the real parameters, the way the handlers send them.
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    result = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params)).scalar()
+    plan = (json.loads(result) if isinstance(result, str) else result)[0]["Plan"]
+    return [relation for node, relation in scans(plan) if node == "Seq Scan" and relation in ("goal", "practice_session")]
+
+async def test_listing_filters_use_indexes(app):
+    from app.db import engine
+    from app.routers.goals import goals_stmt
+    from app.routers.sessions import sessions_stmt
+
+    async with engine.begin() as conn:
+        user_id, goal_id = await seeded_user(conn)
+
+        for after, complete, prefix in itertools.product((None, uuid.UUID(int=0)), (None, True, False), (None, "Goal 1")):
+            stmt = goals_stmt(user_id, 50, after, complete, prefix)
+            assert await seq_scans(conn, stmt) == [], (after, complete, prefix)
+
+        for after, goal, date_from, date_to, descending in itertools.product(
+            (None, (date(2024, 6, 1), uuid.UUID(int=0))),
+            (None, goal_id),
+            (None, date(2024, 3, 1)),
+            (None, date(2024, 9, 30)),
+            (False, True),
+        ):
+            stmt = sessions_stmt(user_id, 50, after, goal, date_from, date_to, descending)
+            assert await seq_scans(conn, stmt) == [], (after, goal, date_from, date_to, descending)
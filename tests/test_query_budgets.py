@@ -0,0 +1,83 @@
+import pytest
+
+pytestmark = [pytest.mark.anyio, pytest.mark.postgres]
+
+def covered_routes() -> list:
+    # Imported here, since importing the app needs DATABASE_URL.
+    from app.routers import goals, sessions, stats, search, sync
+    routers = (goals.router, sessions.router, stats.router, search.router, sync.router)
+    return [route for router in routers for route in router.routes]
+
+async def seed(client, auth) -> tuple[list[str], list[str]]:
+    """A few goals with a few sessions each, so a query per row would show."""
+    goal_ids, session_ids = [], []
+    for i in range(3):
+        response = await client.post("/goals/new", json={"title": f"Goal {i}", "description": "d"}, headers=auth)
+        goal_ids.append(response.json()["id"])
+    rows = [
+        {"date": f"2024-01-0{day}", "start_time": "10:00", "end_time": "10:30", "notes": "n", "goal_id": goal_id}
+        for goal_id in goal_ids for day in range(1, 5)
+    ]
+    response = await client.post("/practice_session/bulk", json=rows, headers=auth)
+    session_ids = [s["id"] for s in response.json()["created"]]
+    return goal_ids, session_ids
+
+async def test_every_route_stays_within_its_budget(budgeted_client, auth):
+    client = budgeted_client
+    goal_ids, session_ids = await seed(client, auth)
+    goal, other_goal = goal_ids[0], goal_ids[1]
+    session, other_session = session_ids[0], session_ids[-1]
+    csv = f"date,start_time,end_time,goal_id,goal_title\n2024-02-01,10:00,10:30,{goal},\n2024-02-02,10:00,10:30,,New goal\n"
+    # Taken before the writes below, so the delta sync at the end reads every stream.
+    sync_token = (await client.get("/sync", headers=auth)).json()["token"]
+
+    calls = [
+        ("GET", "/goals/", {}),
+        ("GET", "/goals/?include=sessions,totals&complete=false&title_prefix=Goal&limit=2", {}),
+        ("GET", f"/goals/{goal}?include=sessions,totals", {}),
+        ("GET", f"/goals/{goal}/sessions?limit=2", {}),
+        ("POST", "/goals/new", {"json": {"title": "Another", "description": "d"}}),
+        ("PATCH", f"/goals/complete/{goal}", {"json": {"complete": True}}),
+        ("PUT", f"/goals/update/{goal}", {"json": {"title": "Renamed", "description": "d", "complete": False}}),
+        ("GET", "/practice_session/", {}),
+        ("GET", f"/practice_session/?goal_id={goal}&from=2024-01-02&to=2024-01-03&order=desc", {}),
+        ("GET", "/practice_session/export?format=ndjson", {}),
+        ("GET", f"/practice_session/{session}", {}),
+        ("POST", "/practice_session/new", {"json": {
+            "date": "2024-01-09", "start_time": "09:00", "end_time": "09:15", "notes": "n", "goal_id": goal
+        }}),
+        ("POST", "/practice_session/bulk", {"json": [
+            {"date": "2024-01-10", "start_time": "09:00", "end_time": "09:15", "notes": "n", "goal_id": goal}
+        ]}),
+        ("POST", "/practice_session/import", {"files": {"file": ("history.csv", csv.encode(), "text/csv")}}),
+        ("PUT", f"/practice_session/update/{session}", {"json": {
+            "notes": "Fast", "start_time": "11:00", "end_time": "11:20"
+        }}),
+        ("PATCH", f"/practice_session/update/{session}", {"json": {"notes": "Faster"}}),
+        ("GET", "/stats/goals", {}),
+        ("GET", f"/stats/periods/week?from=2024-01-01&to=2024-12-31&goal_id={goal}", {}),
+        ("GET", "/stats/streaks?today=2024-01-05", {}),
+        ("GET", "/search/goals?q=goal&limit=2", {}),
+        ("GET", "/search/sessions?q=n&limit=2", {}),
+        ("GET", "/sync?limit=2", {}),
+        ("DELETE", f"/practice_session/delete/{other_session}", {}),
+        ("DELETE", f"/goals/delete/{other_goal}", {}),
+        ("GET", f"/sync?since={sync_token}", {}),
+    ]
+
+    for method, url, kwargs in calls:
+        # QueryBudgetExceeded propagates out of the client call when a route goes over.
+        response = await client.request(method, url, headers=auth, **kwargs)
+        assert response.status_code < 400, (method, url, response.text)
+
+    expected = {(method, route.path) for route in covered_routes() for method in route.methods}
+    called = {(m, path) for m, path in expected if any(m == c and path_matches(path, url) for c, url, _ in calls)}
+    assert expected - called == set(), "Add a call for each new route."
+
+def path_matches(template: str, url: str) -> bool:
+    parts, actual = template.strip("/").split("/"), url.split("?")[0].strip("/").split("/")
+    return len(parts) == len(actual) and all(p.startswith("{") or p == a for p, a in zip(parts, actual))
+
+def test_budgets_are_declared_on_every_route():
+    for route in covered_routes():
+        assert hasattr(route.endpoint, "query_budget"), f"{route.path} has no @query_budget."
@@ -0,0 +1,33 @@
+import pytest
+
+pytestmark = [pytest.mark.anyio, pytest.mark.postgres]
+
+@pytest.fixture
+def strict_limit(monkeypatch):
+    """Rate limiting on, with a bucket of one token that barely refills."""
+    from app import ratelimit
+
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(ratelimit, "backend", ratelimit.MemoryBackend(0.001, 1, 100))
+
+async def test_rejected_request_runs_no_queries(client, auth, count_statements, strict_limit):
+    from app.db import user_cache
+
+    # Spends the only token.
+    assert (await client.get("/goals/", headers=auth)).status_code != 429
+    user_cache.clear()
+
+    with count_statements() as log:
+        response = await client.get("/goals/", headers=auth)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"]
+    assert log.count == 0, log.statements
+
+async def test_free_routes_skip_authentication(client, auth, count_statements, strict_limit):
+    from app.db import user_cache
+
+    user_cache.clear()
+    with count_statements() as log:
+        response = await client.get("/health/live", headers=auth)
+    assert response.status_code == 200
+    assert log.count == 0, log.statements
@@ -0,0 +1,121 @@
+import pytest
+import uuid
+
+@pytest.fixture
+def read_cache_on(monkeypatch):
+    """The read cache with a TTL, whatever WEB_WORKERS and READ_CACHE_TTL say."""
+    from app.cache import read_cache
+
+    monkeypatch.setattr(read_cache.entries, "ttl", 30)
+    return read_cache
+
+async def new_goal(client, auth, title: str = "Scales") -> None:
+    """Adds a goal through the API, then drops the write marker, as another client would be."""
+    await client.post("/goals/new", json={"title": title, "description": "d"}, headers=auth)
+    client.cookies.clear()
+
+async def user_id(client, auth) -> uuid.UUID:
+    return uuid.UUID((await client.get("/users/me", headers=auth)).json()["id"])
+
+async def insert_goal(user_id: uuid.UUID, title: str) -> None:
+    """Writes behind the handlers' backs, so nothing bumps the read cache."""
+    from sqlalchemy import insert
+    from app.db import Goal, async_session_maker
+
+    async with async_session_maker() as db:
+        await db.execute(insert(Goal).values(title=title, description="d", user_id=user_id))
+        await db.commit()
+
+@pytest.mark.anyio
+@pytest.mark.postgres
+async def test_matching_etag_is_304(client, auth, count_statements, read_cache_on):
+    await new_goal(client, auth)
+    response = await client.get("/goals/", headers=auth)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    with count_statements() as log:
+        response = await client.get("/goals/", headers={**auth, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+    assert log.count == 0, log.statements
+
+    response = await client.get("/goals/", headers={**auth, "If-None-Match": '"something-else"'})
+    assert response.status_code == 200
+
+@pytest.mark.anyio
+@pytest.mark.postgres
+async def test_bump_makes_the_next_read_miss(client, auth, read_cache_on):
+    await new_goal(client, auth)
+    before = (await client.get("/goals/", headers=auth)).json()["items"]
+
+    user = await user_id(client, auth)
+    await insert_goal(user, "Arpeggios")
+    assert (await client.get("/goals/", headers=auth)).json()["items"] == before
+
+    read_cache_on.bump(user)
+    titles = {goal["title"] for goal in (await client.get("/goals/", headers=auth)).json()["items"]}
+    assert titles == {"Scales", "Arpeggios"}
+
+@pytest.mark.anyio
+@pytest.mark.postgres
+async def test_reads_are_fresh_with_the_cache_off(client, auth, monkeypatch):
+    from app.cache import read_cache
+
+    monkeypatch.setattr(read_cache.entries, "ttl", 0)
+    await new_goal(client, auth)
+    response = await client.get("/goals/", headers=auth)
+    etag = response.headers["ETag"]
+    assert (await client.get("/goals/", headers={**auth, "If-None-Match": etag})).status_code == 304
+
+    await insert_goal(await user_id(client, auth), "Arpeggios")
+    response = await client.get("/goals/", headers={**auth, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
+
+def test_versions_are_bounded():
+    from app.cache import UserReadCache
+
+    cache = UserReadCache(maxsize=2, ttl=30)
+    users = [uuid.uuid4() for _ in range(3)]
+    first = cache.version(users[0])
+    cache.bump(users[0])
+    bumped = cache.version(users[0])
+    assert bumped != first
+
+    # Pushing users[0] out must not put it back on a version its old entries used.
+    cache.bump(users[1])
+    cache.bump(users[2])
+    assert len(cache._versions) == 2
+    assert cache.version(users[0]) not in {first, bumped}
+
+@pytest.mark.anyio
+@pytest.mark.postgres
+async def test_write_on_another_worker_is_read_back(client, auth, read_cache_on, monkeypatch):
+    from app.cache import STICKY_HEADER, TTLCache
+
+    await new_goal(client, auth)
+    response = await client.get("/goals/", headers=auth)
+    etag = response.headers["ETag"]
+
+    response = await client.post("/goals/new", json={"title": "Arpeggios", "description": "d"}, headers=auth)
+    marker = response.headers[STICKY_HEADER]
+    # Forget the bump, as a worker that didn't serve the write would have.
+    monkeypatch.setattr(read_cache_on, "_versions", TTLCache(10, 30))
+
+    # The cookie from the write.
+    response = await client.get("/goals/", headers={**auth, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert {goal["title"] for goal in response.json()["items"]} == {"Scales", "Arpeggios"}
+
+    # The echoed header, for clients without a cookie jar.
+    client.cookies.clear()
+    response = await client.get("/goals/", headers={**auth, "If-None-Match": etag, STICKY_HEADER: marker})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
+
+    # The rebuilt body also replaced this worker's entry from before the write.
+    response = await client.get("/goals/", headers={**auth, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 2
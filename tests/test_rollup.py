@@ -0,0 +1,107 @@
+import pytest
+import uuid
+
+pytestmark = [pytest.mark.anyio, pytest.mark.postgres]
+
+async def rollup_and_sessions(user_id: uuid.UUID) -> tuple[set, set]:
+    """The user's rollup rows, and the same totals computed from practice_session."""
+    from sqlalchemy import select, func
+    from app.db import Goal, PracticeSession, PracticeDailyRollup, async_session_maker
+
+    async with async_session_maker() as db:
+        rollup = await db.execute(
+            select(
+                PracticeDailyRollup.goal_id,
+                PracticeDailyRollup.date,
+                PracticeDailyRollup.total_minutes,
+                PracticeDailyRollup.session_count
+            )
+            .where(PracticeDailyRollup.user_id == user_id)
+        )
+        sessions = await db.execute(
+            select(
+                PracticeSession.goal_id,
+                PracticeSession.date,
+                func.coalesce(func.sum(PracticeSession.duration), 0),
+                func.count()
+            )
+            .join(Goal, PracticeSession.goal_id == Goal.id)
+            .where(Goal.user_id == user_id)
+            .group_by(PracticeSession.goal_id, PracticeSession.date)
+        )
+        return set(map(tuple, rollup)), set(map(tuple, sessions))
+
+async def assert_rollup_matches(user_id: uuid.UUID) -> None:
+    rollup, sessions = await rollup_and_sessions(user_id)
+    assert rollup == sessions
+
+def session(goal_id: str, day: int, start_time="10:00", end_time="10:30") -> dict:
+    return {"date": f"2024-01-0{day}", "start_time": start_time, "end_time": end_time, "notes": "n", "goal_id": goal_id}
+
+async def test_rollup_follows_every_write_path(client, auth):
+    user_id = uuid.UUID((await client.get("/users/me", headers=auth)).json()["id"])
+    goals = [
+        (await client.post("/goals/new", json={"title": f"Goal {n}", "description": "d"}, headers=auth)).json()["id"]
+        for n in range(2)
+    ]
+
+    # Single insert.
+    response = await client.post("/practice_session/new", json=session(goals[0], 1), headers=auth)
+    single = response.json()["id"]
+    await assert_rollup_matches(user_id)
+
+    # Bulk insert, several rows landing on the same day.
+    rows = [session(goals[n % 2], 1 + n % 3, "23:30", "00:15") for n in range(6)]
+    response = await client.post("/practice_session/bulk", json=rows, headers=auth)
+    bulk = [s["id"] for s in response.json()["created"]]
+    await assert_rollup_matches(user_id)
+
+    # COPY import.
+    csv = "date,start_time,end_time,goal_id\n" + "".join(f"2024-01-0{day},09:00,09:50,{goals[1]}\n" for day in (2, 4, 4))
+    response = await client.post("/practice_session/import", files={"file": ("s.csv", csv, "text/csv")}, headers=auth)
+    assert response.status_code == 201, response.text
+    await assert_rollup_matches(user_id)
+
+    # PUT moves a session to a day with nothing else on it.
+    response = await client.put(f"/practice_session/update/{single}", json=session(goals[0], 5, "08:00", "09:15"), headers=auth)
+    assert response.status_code == 200, response.text
+    await assert_rollup_matches(user_id)
+
+    # PATCH moves the last session on goal 0's day 1 to the other goal, so that rollup row
+    # reaches zero and is deleted, then changes only its times.
+    response = await client.patch(f"/practice_session/update/{bulk[0]}", json={"goal_id": goals[1]}, headers=auth)
+    assert response.status_code == 200, response.text
+    response = await client.patch(f"/practice_session/update/{bulk[0]}", json={"end_time": "00:45"}, headers=auth)
+    assert response.status_code == 200, response.text
+    await assert_rollup_matches(user_id)
+
+    # Single delete.
+    assert (await client.delete(f"/practice_session/delete/{bulk[1]}", headers=auth)).status_code == 204
+    await assert_rollup_matches(user_id)
+
+    # Deleting a goal cascades to its sessions. The triggers can't join to the goal any
+    # more, and the rollup rows go with the goal's own cascade.
+    assert (await client.delete(f"/goals/delete/{goals[1]}", headers=auth)).status_code == 204
+    await assert_rollup_matches(user_id)
+    rollup, _ = await rollup_and_sessions(user_id)
+    assert rollup and {goal_id for goal_id, *_ in rollup} == {uuid.UUID(goals[0])}
+
+async def test_rebuild_rollup_restores_the_totals(client, auth):
+    from sqlalchemy import update
+    from app.db import PracticeDailyRollup, async_session_maker
+    from app.rollup import rebuild_rollup
+
+    user_id = uuid.UUID((await client.get("/users/me", headers=auth)).json()["id"])
+    goal = (await client.post("/goals/new", json={"title": "Goal", "description": "d"}, headers=auth)).json()["id"]
+    await client.post("/practice_session/bulk", json=[session(goal, day) for day in (1, 1, 2)], headers=auth)
+
+    async with async_session_maker() as db:
+        await db.execute(
+            update(PracticeDailyRollup).where(PracticeDailyRollup.user_id == user_id).values(total_minutes=0, session_count=99)
+        )
+        await db.commit()
+    rollup, sessions = await rollup_and_sessions(user_id)
+    assert rollup != sessions
+
+    await rebuild_rollup(batch_size=5000)
+    await assert_rollup_matches(user_id)
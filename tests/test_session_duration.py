@@ -0,0 +1,35 @@
+import pytest
+
+pytestmark = [pytest.mark.anyio, pytest.mark.postgres]
+
+async def new_session(client, auth, start_time: str, end_time: str) -> dict:
+    goal = (await client.post("/goals/new", json={"title": "Scales", "description": "d"}, headers=auth)).json()["id"]
+    response = await client.post("/practice_session/new", json={
+        "date": "2024-01-01", "start_time": start_time, "end_time": end_time, "notes": "n", "goal_id": goal
+    }, headers=auth)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+@pytest.mark.parametrize("start_time, end_time, minutes", [
+    ("10:00", "10:30", 30),
+    ("23:30", "00:15", 45),
+    ("10:00", "10:00", 0),
+])
+async def test_duration(client, auth, start_time, end_time, minutes):
+    assert (await new_session(client, auth, start_time, end_time))["duration"] == minutes
+
+async def test_duration_follows_core_update(client, auth):
+    from datetime import time
+    from sqlalchemy import update
+    from app.db import PracticeSession, async_session_maker
+
+    session = await new_session(client, auth, "23:00", "23:30")
+    async with async_session_maker() as db:
+        stmt = (
+            update(PracticeSession)
+            .where(PracticeSession.id == session["id"])
+            .values(end_time=time(0, 20))
+            .returning(PracticeSession.duration)
+        )
+        assert await db.scalar(stmt) == 80
+        await db.commit()
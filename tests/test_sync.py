@@ -0,0 +1,65 @@
+import pytest
+
+pytestmark = [pytest.mark.anyio, pytest.mark.postgres]
+
+async def sync_all(client, auth, token=None, limit=2) -> dict:
+    """Reads every page of a sync and merges them, checking each stays within `limit`."""
+    merged = {"goals": [], "practice_sessions": [], "deleted_goals": [], "deleted_practice_sessions": []}
+    while True:
+        params = {"limit": limit, **({"since": token} if token else {})}
+        response = await client.get("/sync", params=params, headers=auth)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert sum(len(page[key]) for key in merged) <= limit
+        for key in merged:
+            merged[key] += page[key]
+        token = page["token"]
+        if not page["has_more"]:
+            return {**merged, "token": token, "full": page["full"]}
+
+async def test_sync_pages_through_changes(client, auth):
+    goal_ids = []
+    for n in range(3):
+        response = await client.post("/goals/new", json={"title": f"Goal {n}", "description": "d"}, headers=auth)
+        goal_ids.append(response.json()["id"])
+    session_ids = []
+    for n in range(5):
+        session = {"date": "2024-01-01", "start_time": "10:00", "end_time": "10:30", "notes": f"{n}", "goal_id": goal_ids[n % 3]}
+        session_ids.append((await client.post("/practice_session/new", json=session, headers=auth)).json()["id"])
+
+    full = await sync_all(client, auth)
+    assert full["full"]
+    assert sorted(goal["id"] for goal in full["goals"]) == sorted(goal_ids)
+    assert sorted(session["id"] for session in full["practice_sessions"]) == sorted(session_ids)
+
+    await client.delete(f"/practice_session/delete/{session_ids[0]}", headers=auth)
+    await client.delete(f"/goals/delete/{goal_ids[2]}", headers=auth)
+    await client.post("/goals/new", json={"title": "Goal 3", "description": "d"}, headers=auth)
+
+    delta = await sync_all(client, auth, full["token"])
+    assert not delta["full"]
+    assert [goal["title"] for goal in delta["goals"]] == ["Goal 3"]
+    assert delta["practice_sessions"] == []
+    assert [goal["id"] for goal in delta["deleted_goals"]] == [goal_ids[2]]
+    assert [session["id"] for session in delta["deleted_practice_sessions"]] == [session_ids[0]]
+
+    empty = await sync_all(client, auth, delta["token"])
+    assert sum(len(empty[key]) for key in ("goals", "practice_sessions", "deleted_goals", "deleted_practice_sessions")) == 0
+
+async def test_full_sync_is_not_cached(client, auth):
+    await client.post("/goals/new", json={"title": "Goal", "description": "d"}, headers=auth)
+    response = await client.get("/sync", headers=auth)
+    assert response.status_code == 200
+    assert "etag" not in response.headers
+
+@pytest.mark.parametrize("values", [
+    ("1", "0"),
+    ("", "0", "", "0", "9", "", ""),
+    ("", "0", "", "0", "0", "5", ""),
+    ("", "0", "", "0", "0", "5", "not-a-uuid"),
+])
+async def test_malformed_sync_token(client, auth, values):
+    from app.pagination import encode_cursor
+
+    response = await client.get("/sync", params={"since": encode_cursor(*values)}, headers=auth)
+    assert response.status_code == 400
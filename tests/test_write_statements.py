@@ -0,0 +1,47 @@
+import pytest
+import uuid
+
+pytestmark = [pytest.mark.anyio, pytest.mark.postgres]
+
+async def make_goal(client, auth) -> str:
+    response = await client.post("/goals/new", json={"title": "Scales", "description": "Major keys"}, headers=auth)
+    assert response.status_code == 201
+    return response.json()["id"]
+
+async def make_session(client, auth, goal_id: str) -> str:
+    response = await client.post("/practice_session/new", json={
+        "date": "2024-01-01", "start_time": "10:00", "end_time": "10:30", "notes": "Slow", "goal_id": goal_id
+    }, headers=auth)
+    assert response.status_code == 201
+    return response.json()["id"]
+
+@pytest.mark.parametrize("method, path, body, status", [
+    ("PATCH", "/goals/complete/{goal}", {"complete": True}, 200),
+    ("PUT", "/goals/update/{goal}", {"title": "Arpeggios", "description": "Minor keys", "complete": False}, 200),
+    ("DELETE", "/goals/delete/{goal}", None, 204),
+    ("PUT", "/practice_session/update/{session}", {"notes": "Fast", "start_time": "11:00", "end_time": "11:20"}, 200),
+    ("PATCH", "/practice_session/update/{session}", {"notes": "Faster"}, 200),
+    ("DELETE", "/practice_session/delete/{session}", None, 204),
+])
+async def test_write_runs_one_statement(client, auth, count_statements, method, path, body, status):
+    goal = await make_goal(client, auth)
+    session = await make_session(client, auth, goal)
+    url = path.format(goal=goal, session=session)
+
+    with count_statements() as log:
+        response = await client.request(method, url, json=body, headers=auth)
+    assert response.status_code == status, response.text
+    assert log.count == 1, log.statements
+
+    # Someone else's row, or no row at all, is a 404 from the same single statement.
+    with count_statements() as log:
+        response = await client.request(method, path.format(goal=uuid.uuid4(), session=uuid.uuid4()), json=body, headers=auth)
+    assert response.status_code == 404
+    assert log.count == 1, log.statements
+
+async def test_new_session_checks_goal_then_inserts(client, auth, count_statements):
+    goal = await make_goal(client, auth)
+
+    with count_statements() as log:
+        await make_session(client, auth, goal)
+    assert log.count == 2, log.statements